@@ -1,20 +1,338 @@
 import asyncio
+import atexit
 import json
 import os
+import random
+import re
 import time
 import csv
+import hashlib
+import sqlite3
+import threading
+import weakref
 import psutil
-from typing import Dict, List, Any, Optional, Callable
+import httpx
+from collections import deque
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from functools import wraps
-from openai import AsyncOpenAI
+from openai import (
+    AsyncOpenAI, DefaultAsyncHttpxClient,
+    RateLimitError, AuthenticationError, APIConnectionError, APITimeoutError,
+    ConflictError, InternalServerError
+)
 from dotenv import load_dotenv
 
+# orjson serializes/parses several times faster than the stdlib and works in bytes;
+# fall back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
+# Response cache rows written between SQLite commits
+CACHE_COMMIT_EVERY = 100
+
+# Product assessment columns, in the order the model is asked to rate them
+ASSESSMENT_FIELDS = [
+    'Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save',
+    'Gated', 'Electronics_Batteries', 'Insurance_Gov'
+]
+
+# Neutral assessment used when the model's answer for a product is unusable
+DEFAULT_ASSESSMENT = {
+    'Seasonal': 3, 'Specificity': 3, 'Commodity': 3,
+    'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0,
+    'Insurance_Gov': 0
+}
+
+# Upper bound of each assessment rating, in ASSESSMENT_FIELDS order
+ASSESSMENT_MAX = (5, 5, 5, 5, 1, 1, 1)
+
+# JSON keys of the structured product response, in ASSESSMENT_FIELDS order
+ASSESSMENT_JSON_KEYS = [
+    'seasonal', 'specificity', 'commodity', 'subscribe_save',
+    'gated', 'electronics_batteries', 'insurance_gov'
+]
+
+# Static prompt text, built once so every request shares a byte-identical prefix.
+# The batch's terms go last: everything before them is the same for every
+# request and can be served from the API's prompt cache
+MODEL = "gpt-4o-mini"
+
+_BRAND_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a brand identification expert."
+}
+_BRAND_PROMPT_PREFIX = """Are these keywords brands? Return one item per keyword.
+
+Rules:
+- If it's a brand name, return the brand name
+- If it's not a brand, return "no"
+- Generic product categories = "no" (electric toothbrush, body wash, water flosser)
+- Use exact keyword spelling for "term"
+
+Example: makeup is "no", nike is "nike", toothbrush is "no".
+
+Keywords: """
+
+_PRODUCT_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an e-commerce product analyst."
+}
+_PRODUCT_PROMPT_PREFIX = """Assess these products for e-commerce potential. For each product, provide ratings:
+
+Important: Judge each keyword **independently**, not relative to others in the batch.
+
+Rate each product (0-5 scale) for:
+1. SEASONAL DEMAND: 0=flat year, 5=strongly seasonal
+2. SPECIFICITY (0–5): How narrow is shopper intent?  
+    0–1 = almost all generic category terms (any 1–2 word basics).
+    2 = at least one real differentiator (electric toothbrush).
+    3 = ingredient-based or niche use (magnesium glycinate).
+    4–5 = ultra-modifier heavy / SKU-like.
+3. COMMODITY: 0=brand-owned, 5=commodity
+4. SUBSCRIBE & SAVE: 0=not suitable, 5=perfect for subscription
+
+Plus binary (0/1) for:
+5. GATED (1 if restricted Amazon category (OTC, medical device, adult, pesticides, hazmat, etc. — not supplements), else 0)
+6. ELECTRONICS/BATTERIES (1 if electronic, battery-powered, or requires replacement heads/charging)
+7. INSURANCE/GOV (1 if reimbursed by insurance or supplied free by gov programs)
+
+Return one item per product, using the exact product spelling for "term".
+
+Example: makeup -> seasonal 2, specificity 2, commodity 3, subscribe_save 2, gated 0, electronics_batteries 0, insurance_gov 0
+
+Products: """
+
+# Structured output schemas: the API guarantees responses match these, so
+# parsing is a single JSON load and ratings are range-checked server side
+def _json_schema_format(name: str, item_properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap an item schema as a strict {"items": [...]} response_format."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": item_properties,
+                            "required": list(item_properties),
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["items"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+_BRAND_RESPONSE_FORMAT = _json_schema_format("brand_identification", {
+    "term": {"type": "string"},
+    "brand": {"type": "string"}
+})
+
+_PRODUCT_RESPONSE_FORMAT = _json_schema_format("product_assessment", {
+    "term": {"type": "string"},
+    **{key: {"type": "integer", "enum": list(range(top + 1))}
+       for key, top in zip(ASSESSMENT_JSON_KEYS, ASSESSMENT_MAX)}
+})
+
+# Brand identification and product assessment in a single request, answered as JSON
+_COMBINED_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a brand identification expert and e-commerce product analyst. Respond with ONLY a JSON object, no other text."
+}
+_COMBINED_PROMPT_PREFIX = """For each keyword, say whether it is a brand and assess its e-commerce potential.
+
+Brand rules:
+- If it's a brand name, return the brand name
+- If it's not a brand, return "no"
+- Generic product categories = "no" (electric toothbrush, body wash, water flosser)
+
+Important: Judge each keyword **independently**, not relative to others in the batch.
+
+Ratings, in this order (0-5 scale):
+1. SEASONAL DEMAND: 0=flat year, 5=strongly seasonal
+2. SPECIFICITY: 0-1 = generic category terms, 2 = one real differentiator, 3 = ingredient-based or niche use, 4-5 = ultra-modifier heavy / SKU-like
+3. COMMODITY: 0=brand-owned, 5=commodity
+4. SUBSCRIBE & SAVE: 0=not suitable, 5=perfect for subscription
+Then binary (0/1):
+5. GATED (1 if restricted Amazon category (OTC, medical device, adult, pesticides, hazmat, etc. — not supplements), else 0)
+6. ELECTRONICS/BATTERIES (1 if electronic, battery-powered, or requires replacement heads/charging)
+7. INSURANCE/GOV (1 if reimbursed by insurance or supplied free by gov programs)
+
+Return JSON exactly like this, one entry per keyword using the exact keyword spelling:
+{"items": [{"t": "makeup", "b": "no", "r": [2,2,3,2,0,0,0]}, {"t": "nike shoes", "b": "nike", "r": [1,4,1,2,0,0,0]}]}
+
+Keywords: """
+
+# Compact keys keep the combined answer short; strict mode cannot fix the
+# ratings list's length or per-position ranges, so those are still checked
+# when parsing
+_COMBINED_RESPONSE_FORMAT = _json_schema_format("combined_assessment", {
+    "t": {"type": "string"},
+    "b": {"type": "string"},
+    "r": {"type": "array", "items": {"type": "integer", "enum": list(range(max(ASSESSMENT_MAX) + 1))}}
+})
+
+# Minimum seconds between RSS reads; memory is reported several times per batch
+MEMORY_SAMPLE_INTERVAL = 2.0
+
+# Adaptive batch sizing bounds (see AIProcessor._adapt_batch_size)
+MAX_ADAPTIVE_BATCH_SIZE = 50
+BATCH_SIZE_STEP = 5
+
+# Progress bar glyphs, built once and sliced to width on every redraw
+PROGRESS_BAR_MAX_WIDTH = 200
+_BAR_FULL = '█' * PROGRESS_BAR_MAX_WIDTH
+_BAR_EMPTY = '░' * PROGRESS_BAR_MAX_WIDTH
+
+# Default client-side rate limits (gpt-4o-mini, usage tier 1)
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200000
+
+# HTTP/2 lets concurrent requests share one connection; it needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One connection pool shared by every AIProcessor in the process, so brand and
+# product processors reuse the same keep-alive TLS connections
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+# Open processors per pool; the last one to aclose() closes that pool, so
+# processors running side by side do not pull it out from under each other.
+# Counted per client object: processors still holding a pool from an earlier
+# event loop release that pool, never the current one
+_HTTP_CLIENT_USERS: Dict[httpx.AsyncClient, int] = {}
+_HTTP_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _HTTP_CLIENT, _HTTP_CLIENT_LOOP
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    # A pool left open under an earlier event loop (a processor that was never
+    # closed) cannot be reused on this one, so start a fresh pool; the old one
+    # stays registered until its own processors close it
+    if (_HTTP_CLIENT is None or _HTTP_CLIENT.is_closed
+            or (loop is not None and loop is not _HTTP_CLIENT_LOOP)):
+        _HTTP_CLIENT = DefaultAsyncHttpxClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        _HTTP_CLIENT_LOOP = loop
+    return _HTTP_CLIENT
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+def json_loads(data: Any) -> Any:
+    """Parse JSON from str or bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _prompt_hash(*parts: Any) -> str:
+    """Fingerprint the static parts of a prompt, so edited prompts stop matching old cache rows."""
+    return hashlib.sha256(json_dumps(parts)).hexdigest()[:16]
+
+# Cache namespaces: one hash per request kind, computed once at import
+_PROMPT_HASHES = {
+    'brand': _prompt_hash(_BRAND_SYSTEM_MESSAGE, _BRAND_PROMPT_PREFIX, _BRAND_RESPONSE_FORMAT),
+    'product': _prompt_hash(_PRODUCT_SYSTEM_MESSAGE, _PRODUCT_PROMPT_PREFIX, _PRODUCT_RESPONSE_FORMAT),
+    'combined': _prompt_hash(_COMBINED_SYSTEM_MESSAGE, _COMBINED_PROMPT_PREFIX, _COMBINED_RESPONSE_FORMAT)
+}
+
+def _json_items(result: str) -> List[Any]:
+    """Return the "items" array of a JSON response, or [] if it is not usable."""
+    try:
+        data = json_loads(result)
+    except ValueError:
+        return []
+    items = data.get('items') if isinstance(data, dict) else None
+    return items if isinstance(items, list) else []
+
+def _picker(keys: List[Any]) -> Callable[[Any], tuple]:
+    """Return a C-level getter that pulls keys from a row as a tuple, in order."""
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda row: (row[key],)
+    return itemgetter(*keys)
+
+def _valid_ratings(ratings: Any) -> bool:
+    """Check a list holds exactly one in-range integer per assessment field."""
+    return (
+        isinstance(ratings, list)
+        and len(ratings) == len(ASSESSMENT_FIELDS)
+        and all(isinstance(v, int) and 0 <= v <= top for v, top in zip(ratings, ASSESSMENT_MAX))
+    )
+
+def _match_items(entries: List[Any], items: List[str], term_key: str,
+                 extract: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+    """
+    Map response entries back to the requested items.
+    
+    Args:
+        entries: Parsed JSON entries from the response
+        items: Items that were sent, in request order
+        term_key: Entry key holding the echoed item
+        extract: Returns the value to keep for an entry, or None if it is invalid
+        
+    Returns:
+        Dictionary of item -> extracted value for every item that was answered
+    """
+    # Map items case-insensitively in one pass; casefold() also folds
+    # non-ASCII case variants that lower() misses
+    item_index = {item.casefold(): item for item in items}
+    matched: Dict[str, Any] = {}
+    unmatched = []
+    
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        value = extract(entry)
+        if value is None:
+            continue
+        original_item = item_index.get(str(entry.get(term_key, '')).strip().casefold())
+        
+        if original_item:
+            matched.setdefault(original_item, value)
+        else:
+            unmatched.append((i, value))
+    
+    # Fallback if term matching fails: use the entry's position in the response
+    for i, value in unmatched:
+        if i < len(items):
+            matched.setdefault(items[i], value)
+    
+    return matched
+
 class RATE_LIMIT_HIT(Exception):
     """Custom exception for rate limit errors"""
-    pass
+    
+    def __init__(self, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message)
+        # Seconds the API asked us to wait (Retry-After header), if it said
+        self.retry_after = retry_after
 
 class AUTH_ERROR(Exception):
     """Custom exception for authentication errors"""
@@ -28,6 +346,45 @@ class FILE_SYSTEM_ERROR(Exception):
     """Custom exception for file system errors"""
     pass
 
+# SDK errors that are worth retrying, raised as NETWORK_ERROR: connection problems,
+# timeouts, 5xx responses and 409 lock conflicts (the statuses the SDK would retry
+# itself if its own retries were not turned off)
+TRANSIENT_API_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, ConflictError)
+
+def _header_number(headers: Any, name: str) -> Optional[float]:
+    """Read a numeric response header, or None when it is missing or malformed."""
+    value = headers.get(name) if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+# Go-style durations used by the x-ratelimit-reset-* headers, e.g. "1s", "6m0s", "20ms"
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_SECONDS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+def _header_duration(headers: Any, name: str) -> Optional[float]:
+    """Read a duration response header in seconds, or None when it is missing or malformed."""
+    value = headers.get(name) if headers is not None else None
+    if not isinstance(value, str):
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts or ''.join(number + unit for number, unit in parts) != value.strip():
+        return _header_number(headers, name)
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    """Read the server's requested wait in seconds from a 429 response, if present."""
+    headers = error.response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
 def retry_with_exponential_backoff(max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
     """
     Decorator for exponential backoff retry logic.
@@ -36,7 +393,15 @@ def retry_with_exponential_backoff(max_retries: int = 5, base_delay: float = 1.0
         max_retries: Maximum number of retry attempts
         base_delay: Initial delay in seconds
         max_delay: Maximum delay cap in seconds
+    
+    Waits use full jitter (a random delay up to the capped exponential step) so
+    concurrent batches that hit a limit together do not all retry in the same
+    instant and trigger another burst of 429s. A rate limit never waits less
+    than the API's Retry-After. Authentication errors are not retried.
     """
+    # Capped exponential steps, computed once per decorated function
+    schedule = [min(base_delay * (2 ** attempt), max_delay) for attempt in range(max_retries + 1)]
+    
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -49,17 +414,17 @@ def retry_with_exponential_backoff(max_retries: int = 5, base_delay: float = 1.0
                 except RATE_LIMIT_HIT as e:
                     last_exception = e
                     if attempt < max_retries:
-                        delay = min(base_delay * (2 ** attempt), max_delay)
+                        delay = max(random.uniform(0, schedule[attempt]), e.retry_after or 0)
                         print(f"⚠️ Rate limit hit (attempt {attempt + 1}/{max_retries + 1}). Waiting {delay:.1f}s...")
                         await asyncio.sleep(delay)
                     else:
                         print(f"❌ Max retries ({max_retries}) exceeded for rate limit. Stopping.")
                         raise
                         
-                except (NETWORK_ERROR, AUTH_ERROR) as e:
+                except NETWORK_ERROR as e:
                     last_exception = e
                     if attempt < max_retries:
-                        delay = min(base_delay * (2 ** attempt), max_delay)
+                        delay = random.uniform(0, schedule[attempt])
                         print(f"⚠️ {type(e).__name__} (attempt {attempt + 1}/{max_retries + 1}). Waiting {delay:.1f}s...")
                         await asyncio.sleep(delay)
                     else:
@@ -75,39 +440,328 @@ def retry_with_exponential_backoff(max_retries: int = 5, base_delay: float = 1.0
         return wrapper
     return decorator
 
+class AsyncRateLimiter:
+    """
+    Leaky-bucket rate limiter for asyncio code.
+    
+    Allows up to max_rate units per time_period; callers that would exceed the
+    budget wait just long enough for capacity to free up.
+    """
+    
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            max_rate: Units allowed per time period (requests, tokens, ...)
+            time_period: Length of the period in seconds
+        """
+        self.max_rate = max_rate
+        self.ceiling = max_rate
+        self.time_period = time_period
+        self._level = 0.0
+        self._last_check = time.monotonic()
+        # Monotonic time before which nobody may acquire (server budget nearly spent)
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+        
+    def _leak(self):
+        """Drain the bucket according to the time elapsed since the last check."""
+        now = time.monotonic()
+        elapsed = now - self._last_check
+        self._level = max(0.0, self._level - elapsed * self.max_rate / self.time_period)
+        self._last_check = now
+        
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Wait until amount units fit in the budget, then consume them.
+        
+        Args:
+            amount: Units to consume (capped at max_rate so a single oversized
+                request cannot block forever)
+            
+        Returns:
+            float: Seconds spent waiting
+        """
+        amount = min(amount, self.max_rate)
+        waited = 0.0
+        
+        async with self._lock:
+            pause = self._resume_at - time.monotonic()
+            if pause > 0:
+                # The server's budget is (nearly) spent: hold everyone until it resets
+                await asyncio.sleep(pause)
+                waited += pause
+                self._leak()
+                self._level = 0.0
+            while True:
+                self._leak()
+                if self._level + amount <= self.max_rate:
+                    self._level += amount
+                    return waited
+                    
+                delay = (self._level + amount - self.max_rate) * self.time_period / self.max_rate
+                await asyncio.sleep(delay)
+                waited += delay
+    
+    def calibrate(self, limit: Optional[float], remaining: Optional[float],
+                  reset: Optional[float] = None, reserve: float = 0.0):
+        """
+        Fold the server's view of the budget into the bucket.
+        
+        Args:
+            limit: Budget the server reports (lowers max_rate, never raises it
+                above the configured rate)
+            remaining: Budget the server says is left; the bucket is filled so it
+                never plans to use more than that
+            reset: Seconds until the server's budget is fully restored
+            reserve: Budget the requests already in flight may still use; when
+                remaining drops below it, acquire waits out reset instead of
+                draining the last of the budget into 429s
+        """
+        if limit is not None and limit > 0:
+            self.max_rate = min(self.ceiling, limit)
+        if remaining is not None:
+            self._leak()
+            self._level = min(self.max_rate, max(self._level, self.max_rate - remaining))
+            if reset is not None and remaining < reserve:
+                self._resume_at = max(self._resume_at, time.monotonic() + reset)
+
+# Request and token budgets shared by every AIProcessor on an event loop: they
+# all spend the same account's RPM/TPM, so processors running side by side
+# (brand identification and the product prefetch) draw from one budget
+# instead of one full budget each. Keyed by loop because the limiters' locks
+# belong to the loop they were first used on
+_RATE_LIMITERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[AsyncRateLimiter, AsyncRateLimiter]]" = weakref.WeakKeyDictionary()
+
+def get_shared_rate_limiters(requests_per_minute: float,
+                             tokens_per_minute: float) -> Tuple[AsyncRateLimiter, AsyncRateLimiter]:
+    """
+    Return the running event loop's request and token limiters, creating them on first use.
+    
+    A processor configured with a lower budget than the shared limiters lowers
+    their ceilings to it, so the shared budget never exceeds any processor's.
+    
+    Args:
+        requests_per_minute: This processor's client-side request budget
+        tokens_per_minute: This processor's client-side token budget
+        
+    Returns:
+        tuple: (request limiter, token limiter)
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No loop yet, nothing to share with
+        return AsyncRateLimiter(requests_per_minute, 60), AsyncRateLimiter(tokens_per_minute, 60)
+    
+    limiters = _RATE_LIMITERS.get(loop)
+    if limiters is None:
+        limiters = (AsyncRateLimiter(requests_per_minute, 60), AsyncRateLimiter(tokens_per_minute, 60))
+        _RATE_LIMITERS[loop] = limiters
+        return limiters
+    
+    for limiter, rate in zip(limiters, (requests_per_minute, tokens_per_minute)):
+        if rate < limiter.ceiling:
+            limiter.ceiling = rate
+            limiter.max_rate = min(limiter.max_rate, rate)
+    return limiters
+
+class ResponseCache:
+    """
+    SQLite store of parsed API answers, one row per term, shared across runs.
+    
+    Rows are keyed by (kind, model, prompt_hash, term), so switching the model or
+    editing a prompt never serves stale answers. Terms are matched case-insensitively.
+    """
+    
+    def __init__(self, path: str, commit_every: int = CACHE_COMMIT_EVERY):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: SQLite database file
+            commit_every: Number of inserted rows between commits
+        """
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        # Calls arrive from worker threads (asyncio.to_thread); one at a time per connection
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps reads cheap while writes are appended to the log
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            kind TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            term TEXT NOT NULL,
+            result BLOB NOT NULL,
+            PRIMARY KEY (kind, model, prompt_hash, term)
+        )""")
+        self._conn.commit()
+        
+    def get_many(self, kind: str, model: str, prompt_hash: str, terms: List[str]) -> Dict[str, Any]:
+        """
+        Look up cached answers for a list of terms.
+        
+        Returns:
+            Dictionary of term -> cached answer for every term that has one
+        """
+        variants: Dict[str, List[str]] = {}
+        for term in terms:
+            variants.setdefault(term.casefold(), []).append(term)
+        
+        found: Dict[str, Any] = {}
+        keys = list(variants)
+        with self._lock:
+            # Stay well under SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT term, result FROM responses WHERE kind = ? AND model = ? AND prompt_hash = ? "
+                    f"AND term IN ({', '.join('?' * len(chunk))})",
+                    (kind, model, prompt_hash, *chunk)
+                ).fetchall()
+                for key, result in rows:
+                    value = json_loads(result)
+                    for term in variants[key]:
+                        found[term] = value
+        return found
+        
+    def put_many(self, kind: str, model: str, prompt_hash: str, answers: Dict[str, Any]):
+        """Insert or replace the answers for a set of terms, committing every commit_every rows."""
+        rows = [(kind, model, prompt_hash, term.casefold(), json_dumps(value))
+                for term, value in answers.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", rows)
+            self._pending += len(rows)
+            if self._pending >= self.commit_every:
+                self._commit()
+            
+    def _commit(self):
+        """Commit pending inserts (caller holds the lock)."""
+        if self._conn is not None and self._pending:
+            self._conn.commit()
+            self._pending = 0
+            
+    def commit(self):
+        """Commit pending inserts."""
+        with self._lock:
+            self._commit()
+            
+    def close(self):
+        """Commit pending inserts and close the database."""
+        with self._lock:
+            if self._conn is not None:
+                self._commit()
+                self._conn.close()
+                self._conn = None
+
 class AIProcessor:
     """
     Helper class to handle OpenAI API interactions, progress tracking, and batch processing
     for both brand_identifier and product_validator scripts.
     """
     
-    def __init__(self, script_type: str, batch_size: int = 10):
+    def __init__(self, script_type: str, batch_size: int = 10, max_concurrency: int = 5,
+                 requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+                 adaptive_batch_size: bool = False,
+                 max_batch_size: int = MAX_ADAPTIVE_BATCH_SIZE,
+                 use_cache: bool = True):
         """
         Initialize the AI processor.
         
         Args:
             script_type: Either "brand_identifier" or "product_validator"
             batch_size: Number of items to process per API call
+            max_concurrency: Maximum number of API calls in flight at once
+            requests_per_minute: Client-side request budget (stay under the account RPM)
+            tokens_per_minute: Client-side token budget (stay under the account TPM)
+            adaptive_batch_size: Grow batch_size while batches succeed quickly and
+                halve it on rate limits or incomplete responses. Off by default so
+                batch boundaries stay the same from run to run
+            max_batch_size: Upper bound for adaptive growth of batch_size
+            use_cache: Answer items from the response cache when possible. When
+                False every item goes to the API and the fresh answers replace
+                the cached ones (re-validation)
         """
         self.script_type = script_type
         self.batch_size = batch_size
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.max_concurrency = max_concurrency
+        
+        # The shared pool is sized well above max_concurrency, so gathered
+        # requests never queue behind each other waiting for a connection
+        # SDK retries are off: retry_with_exponential_backoff is the single retry
+        # layer, so a 429 is not retried 3x inside each of its 6 attempts
+        http_client = get_shared_http_client()
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=http_client,
+            max_retries=0
+        )
+        # Registered against this exact pool, which aclose() releases
+        _HTTP_CLIENT_USERS[http_client] = _HTTP_CLIENT_USERS.get(http_client, 0) + 1
+        self._http_client: Optional[httpx.AsyncClient] = http_client
+        self._sem = asyncio.Semaphore(max_concurrency)
+        
+        # Proactive throttling so requests stay under the account limits
+        # instead of relying on 429s and the retry backoff; the budget is shared
+        # with the other processors on this event loop
+        self._rpm_limiter, self._tpm_limiter = get_shared_rate_limiters(requests_per_minute, tokens_per_minute)
+        # Estimated tokens of the latest request, used to size the token reserve
+        self._request_tokens = 0
         
         # Progress tracking files
-        self.progress_file = f"{script_type}_progress.json"
+        self.progress_file = f"{script_type}_progress.jsonl"
         self.partial_output_file = f"{script_type}_PARTIAL.csv"
         
+        # Partial results file stays open (buffered) for the processor's lifetime
+        self._csv_fp = None
+        self._csv_writer = None
+        self._csv_fields: Optional[List[str]] = None
+        self._csv_pick: Optional[Callable[[Dict[str, Any]], tuple]] = None
+        self._csv_lock = threading.Lock()
+        
+        # Progress log is likewise opened once and appended to for every batch
+        self._progress_fp = None
+        self._progress_lock = threading.Lock()
+        atexit.register(self.close)
+        
+        # Per-term response cache (persists across runs, not removed on cleanup)
+        self.cache_file = f"{script_type}_cache.sqlite"
+        self.use_cache = use_cache
+        self._cache: Optional[ResponseCache] = None
+        self.cache_hits = 0
+        
+        # Items currently being asked about, keyed by (kind, item), so a batch
+        # that meets an item another batch already has in flight waits for that
+        # answer instead of paying for a second request
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        
         # Rate limiting and performance tracking
-        self.requests_per_minute = 0
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
         self.last_request_time = 0
         self.rate_limit_occurrences = 0
         self.total_wait_time = 0
         self.start_time = time.time()
         
+        # Adaptive batch sizing: exponentially weighted latency and error rate
+        self.adaptive_batch_size = adaptive_batch_size
+        self.max_batch_size = max(max_batch_size, batch_size)
+        self._lat_ewma = 0.0
+        self._err_ewma = 0.0
+        
         # Memory and performance monitoring
-        self.memory_usage = []
-        self.processing_speeds = []
-        self.batch_times = []
+        self._process = psutil.Process(os.getpid())
+        self._memory_sample = (0.0, 0.0)  # (monotonic timestamp, MB)
+        # Rolling windows: deques evict the oldest reading in O(1)
+        self.memory_usage = deque(maxlen=100)
+        self.processing_speeds = deque(maxlen=50)
+        self.batch_times = deque(maxlen=50)
         
         # Error tracking
         self.error_counts = {
@@ -118,10 +772,179 @@ class AIProcessor:
             'file_system': 0
         }
         
+        try:
+            self._cache = ResponseCache(self.cache_file)
+            atexit.register(self._cache.close)
+        except sqlite3.Error as e:
+            print(f"⚠️ Response cache unavailable, continuing without it: {e}")
+            self.error_counts['file_system'] += 1
+        
+    async def _cache_lookup(self, kind: str, items: List[str]) -> Dict[str, Any]:
+        """Return cached answers for whichever items have one, counting each hit."""
+        if self._cache is None or not self.use_cache:
+            return {}
+        try:
+            # SQLite reads hit the disk; keep them off the event loop
+            found = await asyncio.to_thread(self._cache.get_many, kind, MODEL, _PROMPT_HASHES[kind], items)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Error reading response cache: {e}")
+            self.error_counts['file_system'] += 1
+            return {}
+        self.cache_hits += len(found)
+        return found
+        
+    async def _cache_store(self, kind: str, answers: Dict[str, Any]):
+        """Save freshly parsed answers to the response cache."""
+        if self._cache is None or not answers:
+            return
+        try:
+            await asyncio.to_thread(self._cache.put_many, kind, MODEL, _PROMPT_HASHES[kind], answers)
+        except sqlite3.Error as e:
+            print(f"⚠️ Error saving response cache: {e}")
+            self.error_counts['file_system'] += 1
+        
+    async def _answer_batch(self, kind: str, items: List[str],
+                            build_request: Callable[[List[str]], Dict[str, Any]],
+                            parse_response: Callable[[str, List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Answer a batch from the response cache, sending only the uncached items to the API.
+        
+        Items that another batch of this processor is already requesting are not
+        sent again: their answers are taken from that request once it finishes.
+        
+        Returns:
+            Dictionary of item -> parsed answer for every item that has one
+        """
+        answers = await self._cache_lookup(kind, items)
+        misses = [item for item in dict.fromkeys(items) if item not in answers]
+        if not misses:
+            return answers
+        
+        # Coalesce with requests already in flight; claim the rest for this batch
+        shared = {item: self._inflight[(kind, item)] for item in misses if (kind, item) in self._inflight}
+        own = [item for item in misses if item not in shared]
+        loop = asyncio.get_running_loop()
+        for item in own:
+            self._inflight[(kind, item)] = loop.create_future()
+        
+        fresh: Dict[str, Any] = {}
+        
+        async def ask(pending: List[str]) -> Dict[str, Any]:
+            # Each response is cached as soon as it is parsed, so answers already
+            # paid for survive a follow-up request that fails (a rate limit, say)
+            # and the retry does not ask for them again. Only answered items are
+            # cached; the rest are asked again next time
+            received = await self._request_answers(pending, build_request, parse_response)
+            await self._cache_store(kind, received)
+            fresh.update(received)
+            return received
+        
+        def release():
+            # Hand this batch's answers to waiting batches (None: ask yourself).
+            # Done before waiting on anyone else, so two batches can never end
+            # up waiting on each other
+            for item in own:
+                future = self._inflight.pop((kind, item), None)
+                if future is not None and not future.done():
+                    future.set_result(fresh.get(item))
+        
+        try:
+            if own:
+                await ask(own)
+            release()
+            if shared:
+                # Shielded so that cancelling this batch does not cancel the other
+                # batch's answer; None means it could not answer and it is asked
+                # again below
+                for item, answer in zip(shared, await asyncio.gather(*map(asyncio.shield, shared.values()))):
+                    if answer is not None:
+                        answers[item] = answer
+            
+            # Reconciliation pass: ask once more, in a smaller request, for the items
+            # the response skipped or answered with unusable values
+            unanswered = [item for item in misses if item not in fresh and item not in answers]
+            if unanswered:
+                print(f"   🔁 Re-requesting {len(unanswered)} unanswered {kind} item(s)...")
+                await ask(unanswered)
+                
+                # Still short (typically a truncated or garbled reply): split what is
+                # left in halves, which the model answers more reliably, one last time
+                unanswered = [item for item in unanswered if item not in fresh]
+                if len(unanswered) > 1:
+                    middle = len(unanswered) // 2
+                    print(f"   ✂️ Splitting {len(unanswered)} still unanswered {kind} item(s) in half...")
+                    await asyncio.gather(ask(unanswered[:middle]), ask(unanswered[middle:]))
+        finally:
+            # Release waiting batches even if this one failed or was cancelled
+            release()
+        
+        answers.update(fresh)
+        return answers
+        
+    async def _request_answers(self, items: List[str],
+                               build_request: Callable[[List[str]], Dict[str, Any]],
+                               parse_response: Callable[[str, List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send one chat completion request for items and parse the reply.
+        
+        Returns:
+            Dictionary of item -> parsed answer for every item the response answered
+        """
+        batch_start_time = time.time()
+        request = build_request(items)
+        async with self._sem:
+            await self._throttle(request)
+            raw_response = await self.client.chat.completions.with_raw_response.create(**request)
+        self._calibrate_limits(raw_response.headers)
+        response = raw_response.parse()
+        
+        result = response.choices[0].message.content.strip()
+        answers = parse_response(result, items)
+        
+        # Log performance metrics
+        batch_time = time.time() - batch_start_time
+        self.log_batch_performance(len(items), batch_time)
+        self._adapt_batch_size(len(answers) == len(items), batch_time)
+        return answers
+        
+    async def _throttle(self, request: Dict[str, Any]):
+        """Wait for request and token budget before sending a chat completion request."""
+        # Rough token estimate: ~4 characters per prompt token plus the completion budget
+        prompt_chars = sum(len(m['content']) for m in request['messages'])
+        estimated_tokens = prompt_chars // 4 + request['max_tokens']
+        self._request_tokens = estimated_tokens
+        
+        waited = await self._rpm_limiter.acquire(1)
+        waited += await self._tpm_limiter.acquire(estimated_tokens)
+        self.total_wait_time += waited
+        
+    def _calibrate_limits(self, headers: Any):
+        """Align the client-side limiters with the x-ratelimit-* headers of a response."""
+        # Up to max_concurrency requests can be in flight when this response
+        # arrives; pause until the reset when the budget left would not cover them
+        self._rpm_limiter.calibrate(
+            _header_number(headers, 'x-ratelimit-limit-requests'),
+            _header_number(headers, 'x-ratelimit-remaining-requests'),
+            _header_duration(headers, 'x-ratelimit-reset-requests'),
+            self.max_concurrency
+        )
+        self._tpm_limiter.calibrate(
+            _header_number(headers, 'x-ratelimit-limit-tokens'),
+            _header_number(headers, 'x-ratelimit-remaining-tokens'),
+            _header_duration(headers, 'x-ratelimit-reset-tokens'),
+            self.max_concurrency * self._request_tokens
+        )
+        
     def get_memory_usage(self) -> float:
-        """Get current memory usage in MB."""
-        process = psutil.Process(os.getpid())
-        return process.memory_info().rss / 1024 / 1024  # Convert to MB
+        """Get current memory usage in MB (sampled at most every MEMORY_SAMPLE_INTERVAL seconds)."""
+        now = time.monotonic()
+        sampled_at, memory_mb = self._memory_sample
+        if sampled_at and now - sampled_at < MEMORY_SAMPLE_INTERVAL:
+            return memory_mb
+            
+        memory_mb = self._process.memory_info().rss / 1048576  # Convert to MB
+        self._memory_sample = (now, memory_mb)
+        return memory_mb
         
     def log_memory_usage(self):
         """Log current memory usage."""
@@ -130,10 +953,6 @@ class AIProcessor:
             'timestamp': time.time(),
             'memory_mb': memory_mb
         })
-        
-        # Keep only last 100 memory readings
-        if len(self.memory_usage) > 100:
-            self.memory_usage = self.memory_usage[-100:]
             
     def get_processing_speed(self) -> float:
         """Calculate processing speed (items per minute)."""
@@ -141,7 +960,7 @@ class AIProcessor:
             return 0.0
         
         # Calculate average speed from last 10 batches
-        recent_speeds = self.processing_speeds[-10:]
+        recent_speeds = list(islice(reversed(self.processing_speeds), 10))
         return sum(recent_speeds) / len(recent_speeds)
         
     def calculate_eta(self, remaining_items: int) -> str:
@@ -163,22 +982,46 @@ class AIProcessor:
         self.processing_speeds.append(speed)
         self.batch_times.append(processing_time)
         
-        # Keep only last 50 performance readings
-        if len(self.processing_speeds) > 50:
-            self.processing_speeds = self.processing_speeds[-50:]
-        if len(self.batch_times) > 50:
-            self.batch_times = self.batch_times[-50:]
+    def _adapt_batch_size(self, success: bool, processing_time: float = 0.0):
+        """
+        Feed one batch outcome into the adaptive batch size controller.
+        
+        Successful batches that are not slower than usual grow batch_size by
+        BATCH_SIZE_STEP up to max_batch_size; a rate limit or a response that
+        could not be fully parsed halves it.
+        """
+        if not self.adaptive_batch_size:
+            return
+            
+        if success:
+            fast = self._lat_ewma == 0.0 or processing_time <= self._lat_ewma * 1.2
+            self._lat_ewma = processing_time if self._lat_ewma == 0.0 else 0.9 * self._lat_ewma + 0.1 * processing_time
+            self._err_ewma *= 0.9
+            if fast and self._err_ewma < 0.01 and self.batch_size < self.max_batch_size:
+                self.batch_size = min(self.max_batch_size, self.batch_size + BATCH_SIZE_STEP)
+        else:
+            self._err_ewma = 0.5 * self._err_ewma + 0.5
+            if self.batch_size > 1:
+                self.batch_size = max(1, self.batch_size // 2)
+                print(f"📉 Reducing batch size to {self.batch_size}")
             
     def get_progress_bar(self, current: int, total: int, width: int = 50) -> str:
         """Generate a text-based progress bar."""
         progress = current / total
+        if width > PROGRESS_BAR_MAX_WIDTH:
+            width = PROGRESS_BAR_MAX_WIDTH
         filled = int(width * progress)
-        bar = '█' * filled + '░' * (width - filled)
         percentage = progress * 100
-        return f"[{bar}] {percentage:.1f}% ({current}/{total})"
+        return f"[{_BAR_FULL[:filled]}{_BAR_EMPTY[:width - filled]}] {percentage:.1f}% ({current}/{total})"
+        
+    async def save_progress(self, current_batch: int, processed_count: int, total_items: int):
+        """
+        Append current progress, with enhanced metrics, to the JSON Lines progress log.
         
-    def save_progress(self, current_batch: int, processed_count: int, total_items: int):
-        """Save current progress to JSON file with enhanced metrics."""
+        Each call writes one small line instead of rewriting the whole file, and
+        the most recent line is the current state. The write runs in a worker
+        thread so it does not stall in-flight API calls.
+        """
         progress_data = {
             'script_type': self.script_type,
             'current_batch': current_batch,
@@ -195,92 +1038,259 @@ class AIProcessor:
             'uptime_seconds': time.time() - self.start_time
         }
         
+        # Serialize on the event loop so the snapshot is consistent
+        data = json_dumps(progress_data) + b'\n'
+        
+        def _write():
+            # Buffered partial rows must reach disk before progress claims they exist
+            self.flush_partial_results(durable=True)
+            
+            with self._progress_lock:
+                if self._progress_fp is None:
+                    self._progress_fp = open(self.progress_file, 'ab', buffering=0)
+                self._progress_fp.write(data)
+                os.fsync(self._progress_fp.fileno())
+        
         try:
-            with open(self.progress_file, 'w') as f:
-                json.dump(progress_data, f, indent=2)
+            await asyncio.to_thread(_write)
         except Exception as e:
             print(f"⚠️ Error saving progress: {e}")
             self.error_counts['file_system'] += 1
             
-    def load_progress(self) -> Optional[Dict[str, Any]]:
-        """Load existing progress from JSON file."""
-        if os.path.exists(self.progress_file):
+    async def load_progress(self) -> Optional[Dict[str, Any]]:
+        """Load existing progress from JSON file without blocking the event loop."""
+        return await asyncio.to_thread(self._load_progress_sync)
+    
+    def _load_progress_sync(self) -> Optional[Dict[str, Any]]:
+        """Load the most recent entry of the progress log."""
+        # Open directly instead of checking existence first: one syscall, no race
+        try:
+            with open(self.progress_file, 'rb') as f:
+                # A crash mid-append can leave a torn last line; fall back to the one before
+                last_lines = deque((line for line in f if line.strip()), maxlen=2)
+        except FileNotFoundError:
+            return None
+            
+        progress = None
+        for line in reversed(last_lines):
             try:
-                with open(self.progress_file, 'r') as f:
-                    progress = json.load(f)
-                    
-                # Restore error counts and performance metrics
-                if 'error_counts' in progress:
-                    self.error_counts.update(progress['error_counts'])
-                if 'rate_limit_occurrences' in progress:
-                    self.rate_limit_occurrences = progress['rate_limit_occurrences']
-                if 'total_wait_time' in progress:
-                    self.total_wait_time = progress['total_wait_time']
-                    
-                return progress
-            except (json.JSONDecodeError, FileNotFoundError) as e:
+                progress = json_loads(line)
+                break
+            except json.JSONDecodeError as e:
                 print(f"⚠️ Error loading progress: {e}")
                 self.error_counts['file_system'] += 1
-                return None
-        return None
-    
-    def save_partial_results(self, results: List[Dict[str, Any]], fieldnames: List[str]):
-        """Save partial results to CSV file with enhanced error handling."""
-        try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.partial_output_file) if os.path.dirname(self.partial_output_file) else '.', exist_ok=True)
+        if progress is None:
+            return None
             
-            # Write to CSV (append mode if file exists, create new if not)
-            mode = 'a' if os.path.exists(self.partial_output_file) else 'w'
+        # Restore error counts and performance metrics
+        if 'error_counts' in progress:
+            self.error_counts.update(progress['error_counts'])
+        if 'rate_limit_occurrences' in progress:
+            self.rate_limit_occurrences = progress['rate_limit_occurrences']
+        if 'total_wait_time' in progress:
+            self.total_wait_time = progress['total_wait_time']
             
-            # Use file locking to prevent corruption
-            with open(self.partial_output_file, mode, newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                
-                # Write header only if creating new file
-                if mode == 'w':
-                    writer.writeheader()
-                
-                # Write results
-                writer.writerows(results)
+        return progress
+    
+    async def save_partial_results(self, results: List[Any], fieldnames: List[str]):
+        """
+        Append partial results to the CSV file with enhanced error handling.
+        
+        results holds either result dicts or rows (tuples/lists) already in
+        fieldnames order, which are written as-is. CSV encoding and the write run in a worker thread so in-flight API calls
+        keep running. Rows are buffered in a long-lived file handle and reach disk
+        on flush_partial_results(), which save_progress() calls before recording
+        that the batch is done.
+        """
+        await asyncio.to_thread(self._save_partial_results_sync, results, fieldnames)
+        
+        # Log memory usage after file operation
+        self.log_memory_usage()
+    
+    def _save_partial_results_sync(self, results: List[Any], fieldnames: List[str]):
+        """Append partial results to the CSV file (blocking)."""
+        try:
+            with self._csv_lock:
+                if self._csv_fp is None:
+                    # Create directory if it doesn't exist
+                    os.makedirs(os.path.dirname(self.partial_output_file) or '.', exist_ok=True)
+                    self._csv_fp = open(self.partial_output_file, 'a', newline='', encoding='utf-8', buffering=1 << 20)
+                    
+                # Callers pass the same fieldnames list every batch, so the identity
+                # check keeps one writer for the whole run without comparing columns
+                if self._csv_writer is None or (self._csv_fields is not fieldnames and self._csv_fields != fieldnames):
+                    self._csv_writer = csv.writer(self._csv_fp)
+                    self._csv_fields = fieldnames
+                    self._csv_pick = _picker(fieldnames)
+                    
+                    # Write header only if the file is new (append mode starts at the end)
+                    if self._csv_fp.tell() == 0:
+                        self._csv_writer.writerow(fieldnames)
                 
-            # Log memory usage after file operation
-            self.log_memory_usage()
+                # Rows are written as tuples in column order, skipping DictWriter's
+                # per-row key checks; results missing a column get '' for it
+                if results and not isinstance(results[0], dict):
+                    rows = results
+                else:
+                    try:
+                        rows = [self._csv_pick(result) for result in results]
+                    except KeyError:
+                        rows = [[result.get(field, '') for field in fieldnames] for result in results]
+                self._csv_writer.writerows(rows)
             
         except Exception as e:
             print(f"⚠️ Error saving partial results: {e}")
             self.error_counts['file_system'] += 1
             raise FILE_SYSTEM_ERROR(f"Failed to save partial results: {e}")
     
-    def read_partial_results(self, fieldnames: List[str]) -> List[Dict[str, Any]]:
-        """Read existing partial results from CSV file."""
-        if not os.path.exists(self.partial_output_file):
-            return []
+    def flush_partial_results(self, durable: bool = False):
+        """
+        Push buffered partial results to disk.
+        
+        Args:
+            durable: Also fsync the file so the rows survive a power loss or OS crash
+        """
+        with self._csv_lock:
+            if self._csv_fp is not None:
+                self._csv_fp.flush()
+                if durable:
+                    os.fsync(self._csv_fp.fileno())
+            
+    def close(self):
+        """Flush and close the partial results and progress file handles."""
+        with self._csv_lock:
+            if self._csv_fp is not None:
+                self._csv_fp.close()
+                self._csv_fp = None
+                self._csv_writer = None
+                self._csv_fields = None
+        with self._progress_lock:
+            if self._progress_fp is not None:
+                self._progress_fp.close()
+                self._progress_fp = None
+    
+    def finalize_partial_results(self, output_path: str, fieldnames: List[str]) -> bool:
+        """
+        Move the partial results file into place as the final output.
+        
+        When the partial file already has the final column layout, renaming it
+        replaces reading every row back and writing it out again.
+        
+        Args:
+            output_path: Path of the final output CSV
+            fieldnames: Column order the final output must have
             
+        Returns:
+            True if the file was moved, False if its header differs from
+            fieldnames (or it is missing) and the caller has to rewrite it
+        """
+        self.close()
         try:
-            results = []
             with open(self.partial_output_file, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+                header = next(csv.reader(f), [])
+            if header != list(fieldnames):
+                return False
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            os.replace(self.partial_output_file, output_path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"⚠️ Could not move partial results into place: {e}")
+            self.error_counts['file_system'] += 1
+            return False
+    
+    async def aclose(self):
+        """
+        Close the partial results file and the response cache, and the shared
+        HTTP connection pool once no other processor is using it.
+        """
+        global _HTTP_CLIENT
+        self.close()
+        if self._cache is not None:
+            self._cache.close()
+        http_client, self._http_client = self._http_client, None
+        if http_client is not None:
+            users = _HTTP_CLIENT_USERS.get(http_client, 1) - 1
+            if users > 0:
+                _HTTP_CLIENT_USERS[http_client] = users
+            else:
+                _HTTP_CLIENT_USERS.pop(http_client, None)
+                await http_client.aclose()
+                if _HTTP_CLIENT is http_client:
+                    _HTTP_CLIENT = None
+    
+    async def read_partial_results(self, fieldnames: List[str]) -> List[Dict[str, Any]]:
+        """Read existing partial results from CSV file without blocking the event loop."""
+        return await asyncio.to_thread(self._read_partial_results_sync, fieldnames)
+    
+    def _read_partial_results_sync(self, fieldnames: List[str]) -> List[Dict[str, Any]]:
+        """Read existing partial results from CSV file."""
+        self.flush_partial_results()
+        try:
+            with open(self.partial_output_file, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
                 
                 # Validate that all required fields are present
-                missing_fields = set(fieldnames) - set(reader.fieldnames or [])
+                missing_fields = set(fieldnames) - set(header)
                 if missing_fields:
                     print(f"⚠️ Warning: Missing fields in partial results: {missing_fields}")
                 
+                # Resolve column positions once; missing columns read from a
+                # trailing '' slot so every row still gets all required fields
+                columns = {name: i for i, name in enumerate(header)}
+                width = len(header)
+                indices = [columns.get(field, width) for field in fieldnames]
+                pick = _picker(indices)
+                
+                results = []
                 for row in reader:
-                    # Ensure all required fields are present
-                    clean_row = {}
-                    for field in fieldnames:
-                        clean_row[field] = row.get(field, '')
-                    results.append(clean_row)
+                    if not row:
+                        continue
+                    if missing_fields or len(row) < width:
+                        row = row[:width] + [''] * (width + 1 - min(len(row), width))
+                    results.append(dict(zip(fieldnames, pick(row))))
                     
             return results
             
+        except FileNotFoundError:
+            return []
         except Exception as e:
             print(f"⚠️ Error reading partial results: {e}")
             self.error_counts['file_system'] += 1
             return []
     
+    def _brand_request(self, keywords: List[str]) -> Dict[str, Any]:
+        """Build the chat completion request for a batch of brand keywords."""
+        prompt = _BRAND_PROMPT_PREFIX + ", ".join(keywords)
+        return {
+            'model': MODEL,
+            'messages': [_BRAND_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            # JSON costs roughly 15 tokens per keyword; leave headroom so it is never truncated
+            'max_tokens': 40 + 20 * len(keywords),
+            'temperature': 0,
+            'response_format': _BRAND_RESPONSE_FORMAT
+        }
+    
+    def _parse_brand_response(self, result: str, keywords: List[str]) -> Dict[str, str]:
+        """
+        Parse a structured brand response.
+        
+        Returns:
+            Dictionary of keyword -> brand for every keyword the response answered
+        """
+        def brand_of(entry: Dict[str, Any]) -> Optional[str]:
+            brand = entry.get('brand')
+            return brand.strip() if isinstance(brand, str) else None
+        
+        return _match_items(_json_items(result), keywords, 'term', brand_of)
+    
+    @staticmethod
+    def _brand_result(keyword: str, brand: Optional[str]) -> Dict[str, str]:
+        """Build the brand result row for a keyword, marking unanswered keywords ERROR_PARSING."""
+        return {'Search Term': keyword, 'Brand': brand if brand is not None else 'ERROR_PARSING'}
+
     @retry_with_exponential_backoff(max_retries=5, base_delay=1.0, max_delay=30.0)
     async def process_brand_batch(self, keywords: List[str]) -> List[Dict[str, str]]:
         """
@@ -292,106 +1302,65 @@ class AIProcessor:
         Returns:
             List of dictionaries with 'Search Term' and 'Brand' keys
         """
-        batch_start_time = time.time()
-        
         try:
-            # Create prompt for multiple keywords
-            keywords_text = ", ".join(keywords)
-            prompt = f"""Are these keywords brands? Return: keyword1:brand1, keyword2:brand2, keyword3:brand3...
-
-Keywords: {keywords_text}
-
-Rules:
-- If it's a brand name, return the brand name
-- If it's not a brand, return "no"
-- Generic product categories = "no" (electric toothbrush, body wash, water flosser)
-- Separate each keyword:brand pair with commas
-- Use exact keyword spelling
-
-Example response: makeup:no, nike:nike, toothbrush:no"""
-
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a brand identification expert. Respond with ONLY keyword:brand pairs separated by commas, no other text."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0
+            brands = await self._answer_batch(
+                'brand', keywords, self._brand_request, self._parse_brand_response
             )
+            return [self._brand_result(kw, brands.get(kw)) for kw in keywords]
             
-            result = response.choices[0].message.content.strip()
-            
-            # Parse the response
-            results = []
-            pairs = [pair.strip() for pair in result.split(',')]
-            
-            for i, pair in enumerate(pairs):
-                if ':' in pair:
-                    keyword_part, brand_part = pair.split(':', 1)
-                    keyword = keyword_part.strip()
-                    brand = brand_part.strip()
-                    
-                    # Find the original keyword (case-insensitive match)
-                    original_keyword = None
-                    for orig_kw in keywords:
-                        if orig_kw.lower() == keyword.lower():
-                            original_keyword = orig_kw
-                            break
-                    
-                    if original_keyword:
-                        results.append({
-                            'Search Term': original_keyword,
-                            'Brand': brand
-                        })
-                    else:
-                        # Fallback if keyword matching fails
-                        results.append({
-                            'Search Term': keywords[i] if i < len(keywords) else f"unknown_{i}",
-                            'Brand': brand
-                        })
-                else:
-                    # Handle malformed responses
-                    results.append({
-                        'Search Term': keywords[i] if i < len(keywords) else f"unknown_{i}",
-                        'Brand': 'ERROR_PARSING'
-                    })
-            
-            # Ensure we have results for all keywords
-            while len(results) < len(keywords):
-                missing_index = len(results)
-                results.append({
-                    'Search Term': keywords[missing_index],
-                    'Brand': 'ERROR_PARSING'
-                })
-            
-            # Log performance metrics
-            batch_time = time.time() - batch_start_time
-            self.log_batch_performance(len(keywords), batch_time)
-            
-            return results
-            
+        # Classify by the SDK's typed exceptions rather than message text
+        except RateLimitError as e:
+            self.error_counts['rate_limit'] += 1
+            self.rate_limit_occurrences += 1
+            self._adapt_batch_size(False)
+            raise RATE_LIMIT_HIT(f"Rate limit exceeded: {e}", _retry_after(e))
+        except AuthenticationError as e:
+            self.error_counts['auth'] += 1
+            raise AUTH_ERROR(f"Authentication error: {e}")
+        except TRANSIENT_API_ERRORS as e:
+            self.error_counts['network'] += 1
+            raise NETWORK_ERROR(f"Network error: {e}")
         except Exception as e:
-            # Log error and categorize
-            if "rate limit" in str(e).lower() or "429" in str(e):
-                self.error_counts['rate_limit'] += 1
-                self.rate_limit_occurrences += 1
-                raise RATE_LIMIT_HIT(f"Rate limit exceeded: {e}")
-            elif "authentication" in str(e).lower() or "401" in str(e):
-                self.error_counts['auth'] += 1
-                raise AUTH_ERROR(f"Authentication error: {e}")
-            elif "network" in str(e).lower() or "timeout" in str(e).lower():
-                self.error_counts['network'] += 1
-                raise NETWORK_ERROR(f"Network error: {e}")
-            else:
-                self.error_counts['parsing'] += 1
-                print(f"⚠️ Error processing brand batch: {e}")
-                # Return default results for all keywords
-                return [
-                    {'Search Term': kw, 'Brand': 'ERROR_API'} 
-                    for kw in keywords
-                ]
+            self.error_counts['parsing'] += 1
+            print(f"⚠️ Error processing brand batch: {e}")
+            # Return default results for all keywords
+            return [
+                {'Search Term': kw, 'Brand': 'ERROR_API'} 
+                for kw in keywords
+            ]
     
+    def _product_request(self, search_terms: List[str]) -> Dict[str, Any]:
+        """Build the chat completion request for a batch of product search terms."""
+        prompt = _PRODUCT_PROMPT_PREFIX + ", ".join(search_terms)
+        return {
+            'model': MODEL,
+            'messages': [_PRODUCT_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            # Each JSON assessment is roughly 50 tokens
+            'max_tokens': 40 + 60 * len(search_terms),
+            'temperature': 0,
+            'response_format': _PRODUCT_RESPONSE_FORMAT
+        }
+    
+    def _parse_product_response(self, result: str, search_terms: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Parse a structured product response.
+        
+        Returns:
+            Dictionary of search term -> assessment for every search term with valid ratings
+        """
+        def ratings_of(entry: Dict[str, Any]) -> Optional[Dict[str, int]]:
+            ratings = [entry.get(key) for key in ASSESSMENT_JSON_KEYS]
+            if not _valid_ratings(ratings):
+                return None
+            return dict(zip(ASSESSMENT_FIELDS, ratings))
+        
+        return _match_items(_json_items(result), search_terms, 'term', ratings_of)
+    
+    @staticmethod
+    def _product_result(search_term: str, assessment: Optional[Dict[str, int]]) -> Dict[str, Any]:
+        """Copy a search term's assessment, using default values if it has none."""
+        return dict(assessment if assessment is not None else DEFAULT_ASSESSMENT)
+
     @retry_with_exponential_backoff(max_retries=5, base_delay=1.0, max_delay=30.0)
     async def process_product_batch(self, search_terms: List[str]) -> List[Dict[str, Any]]:
         """
@@ -403,146 +1372,117 @@ Example response: makeup:no, nike:nike, toothbrush:no"""
         Returns:
             List of dictionaries with assessment results
         """
-        batch_start_time = time.time()
-        
         try:
-            # Create prompt for multiple search terms
-            terms_text = ", ".join(search_terms)
-            prompt = f"""Assess these products for e-commerce potential. For each product, provide ratings:
-
-Products: {terms_text}
-
-Important: Judge each keyword **independently**, not relative to others in the batch.
-
-Rate each product (0-5 scale) for:
-1. SEASONAL DEMAND: 0=flat year, 5=strongly seasonal
-2. SPECIFICITY (0–5): How narrow is shopper intent?  
-    0–1 = almost all generic category terms (any 1–2 word basics).
-    2 = at least one real differentiator (electric toothbrush).
-    3 = ingredient-based or niche use (magnesium glycinate).
-    4–5 = ultra-modifier heavy / SKU-like.
-3. COMMODITY: 0=brand-owned, 5=commodity
-4. SUBSCRIBE & SAVE: 0=not suitable, 5=perfect for subscription
-
-Plus binary (0/1) for:
-5. GATED (1 if restricted Amazon category (OTC, medical device, adult, pesticides, hazmat, etc. — not supplements), else 0)
-6. ELECTRONICS/BATTERIES (1 if electronic, battery-powered, or requires replacement heads/charging)
-7. INSURANCE/GOV (1 if reimbursed by insurance or supplied free by gov programs)
-
-IMPORTANT: You MUST respond with EXACTLY 7 numbers per product, separated by commas.
-Format: product1:1,2,3,4,0,0,0;product2:2,3,2,1,0,1,0
-
-Example: makeup:2,2,3,2,0,0,0;nike_shoes:1,4,1,2,0,0,0"""
-
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an e-commerce product analyst. Respond with ONLY assessment numbers separated by commas and semicolons, no other text."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0
+            assessments = await self._answer_batch(
+                'product', search_terms, self._product_request, self._parse_product_response
             )
+            return [self._product_result(term, assessments.get(term)) for term in search_terms]
             
-            result = response.choices[0].message.content.strip()
-            
-            # Parse the response
-            results = []
-            product_assessments = result.split(';')
-            
-            for i, assessment in enumerate(product_assessments):
-                if ':' in assessment:
-                    product_part, ratings_part = assessment.split(':', 1)
-                    product = product_part.strip()
-                    ratings = [r.strip() for r in ratings_part.split(',')]
-                    
-                    if len(ratings) == 7:
-                        try:
-                            # Convert ratings to appropriate types
-                            seasonal = int(ratings[0])
-                            specificity = int(ratings[1])
-                            commodity = int(ratings[2])
-                            subscribe_save = int(ratings[3])
-                            gated = int(ratings[4])
-                            electronics = int(ratings[5])
-                            insurance = int(ratings[6])
-                            
-                            # Validate ranges
-                            if (0 <= seasonal <= 5 and 0 <= specificity <= 5 and 0 <= commodity <= 5 and 
-                                0 <= subscribe_save <= 5 and 0 <= gated <= 1 and 0 <= electronics <= 1 and 0 <= insurance <= 1):
-                                
-                                results.append({
-                                    'Seasonal': seasonal,
-                                    'Specificity': specificity,
-                                    'Commodity': commodity,
-                                    'Subscribe&Save': subscribe_save,
-                                    'Gated': gated,
-                                    'Electronics_Batteries': electronics,
-                                    'Insurance_Gov': insurance
-                                })
-                            else:
-                                raise ValueError("Rating out of range")
-                                
-                        except (ValueError, IndexError):
-                            # Use default values if parsing fails
-                            results.append({
-                                'Seasonal': 3, 'Specificity': 3, 'Commodity': 3, 
-                                'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0, 
-                                'Insurance_Gov': 0
-                            })
-                    else:
-                        # Use default values if wrong number of ratings
-                        results.append({
-                            'Seasonal': 3, 'Specificity': 3, 'Commodity': 3, 
-                            'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0, 
-                            'Insurance_Gov': 0
-                        })
-                else:
-                    # Use default values if format is wrong
-                    results.append({
-                        'Seasonal': 3, 'Specificity': 3, 'Commodity': 3, 
-                        'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0, 
-                        'Insurance_Gov': 0
-                    })
-            
-            # Ensure we have results for all search terms
-            while len(results) < len(search_terms):
-                results.append({
-                    'Seasonal': 3, 'Specificity': 3, 'Commodity': 3, 
-                    'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0, 
-                    'Insurance_Gov': 0
-                })
-            
-            # Log performance metrics
-            batch_time = time.time() - batch_start_time
-            self.log_batch_performance(len(search_terms), batch_time)
+        # Classify by the SDK's typed exceptions rather than message text
+        except RateLimitError as e:
+            self.error_counts['rate_limit'] += 1
+            self.rate_limit_occurrences += 1
+            self._adapt_batch_size(False)
+            raise RATE_LIMIT_HIT(f"Rate limit exceeded: {e}", _retry_after(e))
+        except AuthenticationError as e:
+            self.error_counts['auth'] += 1
+            raise AUTH_ERROR(f"Authentication error: {e}")
+        except TRANSIENT_API_ERRORS as e:
+            self.error_counts['network'] += 1
+            raise NETWORK_ERROR(f"Network error: {e}")
+        except Exception as e:
+            self.error_counts['parsing'] += 1
+            print(f"⚠️ Error processing product batch: {e}")
+            # Return default results for all search terms
+            return [dict(DEFAULT_ASSESSMENT) for _ in search_terms]
+    
+    def _combined_request(self, items: List[str]) -> Dict[str, Any]:
+        """Build one chat completion request covering both brand and product assessment."""
+        prompt = _COMBINED_PROMPT_PREFIX + ", ".join(items)
+        return {
+            'model': MODEL,
+            'messages': [_COMBINED_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            'max_tokens': 40 + 30 * len(items),
+            'temperature': 0,
+            'response_format': _COMBINED_RESPONSE_FORMAT
+        }
+    
+    def _parse_combined_response(self, result: str, items: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Parse a combined JSON response.
+        
+        Returns:
+            Dictionary of item -> {'Brand', assessment fields...} for every item answered
+        """
+        def row_of(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            brand, ratings = entry.get('b'), entry.get('r')
+            if not isinstance(brand, str) or not _valid_ratings(ratings):
+                return None
+            row = {'Brand': brand.strip()}
+            row.update(zip(ASSESSMENT_FIELDS, ratings))
+            return row
+        
+        return _match_items(_json_items(result), items, 't', row_of)
+    
+    @staticmethod
+    def _combined_row(item: str, row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the merged row for an item, falling back to ERROR_PARSING / default values."""
+        if row is None:
+            row = {'Brand': 'ERROR_PARSING', **DEFAULT_ASSESSMENT}
+        return {'Search Term': item, **row}
+
+    @staticmethod
+    def split_combined_results(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        Split merged combined rows into the brand and product result shapes.
+        
+        Returns:
+            Tuple of (brand_results, product_results) matching process_brand_batch
+            and process_product_batch output
+        """
+        brand_results = [{'Search Term': row['Search Term'], 'Brand': row['Brand']} for row in rows]
+        product_results = [{field: row[field] for field in ASSESSMENT_FIELDS} for row in rows]
+        return brand_results, product_results
+    
+    @retry_with_exponential_backoff(max_retries=5, base_delay=1.0, max_delay=30.0)
+    async def process_combined_batch(self, items: List[str]) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        Identify brands and assess products for a batch in a single API call,
+        halving request count compared to running both batch types separately.
+        
+        Args:
+            items: List of keywords / search terms to process
             
-            return results
+        Returns:
+            Tuple of (brand_results, product_results) in the shapes returned by
+            process_brand_batch and process_product_batch
+        """
+        try:
+            rows = await self._answer_batch(
+                'combined', items, self._combined_request, self._parse_combined_response
+            )
+            return self.split_combined_results([self._combined_row(item, rows.get(item)) for item in items])
             
+        # Classify by the SDK's typed exceptions rather than message text
+        except RateLimitError as e:
+            self.error_counts['rate_limit'] += 1
+            self.rate_limit_occurrences += 1
+            self._adapt_batch_size(False)
+            raise RATE_LIMIT_HIT(f"Rate limit exceeded: {e}", _retry_after(e))
+        except AuthenticationError as e:
+            self.error_counts['auth'] += 1
+            raise AUTH_ERROR(f"Authentication error: {e}")
+        except TRANSIENT_API_ERRORS as e:
+            self.error_counts['network'] += 1
+            raise NETWORK_ERROR(f"Network error: {e}")
         except Exception as e:
-            # Log error and categorize
-            if "rate limit" in str(e).lower() or "429" in str(e):
-                self.error_counts['rate_limit'] += 1
-                self.rate_limit_occurrences += 1
-                raise RATE_LIMIT_HIT(f"Rate limit exceeded: {e}")
-            elif "authentication" in str(e).lower() or "401" in str(e):
-                self.error_counts['auth'] += 1
-                raise AUTH_ERROR(f"Authentication error: {e}")
-            elif "network" in str(e).lower() or "timeout" in str(e).lower():
-                self.error_counts['network'] += 1
-                raise NETWORK_ERROR(f"Network error: {e}")
-            else:
-                self.error_counts['parsing'] += 1
-                print(f"⚠️ Error processing product batch: {e}")
-                # Return default results for all search terms
-                return [
-                    {
-                        'Seasonal': 3, 'Specificity': 3, 'Commodity': 3, 
-                        'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0, 
-                        'Insurance_Gov': 0
-                    }
-                    for _ in search_terms
-                ]
+            self.error_counts['parsing'] += 1
+            print(f"⚠️ Error processing combined batch: {e}")
+            # Return default results for all items
+            return (
+                [{'Search Term': item, 'Brand': 'ERROR_API'} for item in items],
+                [dict(DEFAULT_ASSESSMENT) for _ in items]
+            )
     
     async def process_batch(self, items: List[str], batch_type: str) -> List[Dict[str, Any]]:
         """
@@ -562,19 +1502,142 @@ Example: makeup:2,2,3,2,0,0,0;nike_shoes:1,4,1,2,0,0,0"""
         else:
             raise ValueError(f"Unknown batch type: {batch_type}")
     
+    async def process_many(self, items: List[str], batch_type: str) -> List[Dict[str, Any]]:
+        """
+        Process any number of items by splitting them into batch_size chunks and
+        running the chunks concurrently (bounded by max_concurrency).
+        
+        Args:
+            items: List of items to process
+            batch_type: Either "brand" or "product"
+            
+        Returns:
+            List of processed results, in the same order as items
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        cursor = 0
+        
+        # Workers slice the next chunk when they are ready for it, so batch_size
+        # changes from the adaptive controller apply to the rest of the run
+        async def worker():
+            nonlocal cursor
+            while cursor < len(items):
+                start = cursor
+                batch = items[start:start + self.batch_size]
+                cursor += len(batch)
+                results[start:start + len(batch)] = await self.process_batch(batch, batch_type)
+        
+        workers = min(self.max_concurrency, -(-len(items) // max(self.batch_size, 1)))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+    
+    async def submit_batch_job(self, all_items: List[str], batch_type: str,
+                               poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+        """
+        Process items through the OpenAI Batch API (50% cheaper, separate rate limits,
+        up to 24h turnaround). Intended for offline bulk runs; process_many remains the
+        interactive path and is used for any batch the job fails to answer.
+        
+        Args:
+            all_items: List of items to process
+            batch_type: Either "brand" or "product"
+            poll_interval: Seconds between job status checks
+            
+        Returns:
+            List of processed results, in the same order as all_items
+        """
+        if batch_type == "brand":
+            build_request, parse_response = self._brand_request, self._parse_brand_response
+            to_result = self._brand_result
+        elif batch_type == "product":
+            build_request, parse_response = self._product_request, self._parse_product_response
+            to_result = self._product_result
+        else:
+            raise ValueError(f"Unknown batch type: {batch_type}")
+        
+        # Answer what we can from the cache and only submit the rest
+        answers = await self._cache_lookup(batch_type, all_items)
+        misses = [item for item in dict.fromkeys(all_items) if item not in answers]
+        batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        lines = [
+            json_dumps({
+                'custom_id': f"{batch_type}-{i}",
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': build_request(batch)
+            })
+            for i, batch in enumerate(batches)
+        ]
+        
+        if lines:
+            print(f"📤 Submitting {len(lines)} requests to the OpenAI Batch API...")
+            # Job management calls sit outside the retry decorator, so let the SDK retry them
+            client = self.client.with_options(max_retries=2)
+            input_file = await client.files.create(
+                file=(f"{self.script_type}_batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            job = await client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            
+            while job.status not in ('completed', 'failed', 'expired', 'cancelled'):
+                counts = job.request_counts
+                done = f" ({counts.completed}/{counts.total} done)" if counts else ""
+                print(f"   ⏳ Batch job {job.id}: {job.status}{done}")
+                await asyncio.sleep(poll_interval)
+                job = await client.batches.retrieve(job.id)
+            
+            print(f"   📥 Batch job {job.id} finished with status: {job.status}")
+            
+            if job.output_file_id:
+                content = await client.files.content(job.output_file_id)
+                for line in content.text.splitlines():
+                    if not line.strip():
+                        continue
+                    entry = json_loads(line)
+                    i = int(entry['custom_id'].rsplit('-', 1)[1])
+                    response = entry.get('response') or {}
+                    if response.get('status_code') != 200:
+                        continue
+                    result = response['body']['choices'][0]['message']['content'].strip()
+                    fresh = parse_response(result, batches[i])
+                    await self._cache_store(batch_type, fresh)
+                    answers.update(fresh)
+        
+        # Fall back to regular requests for anything the job did not answer:
+        # failed requests whole, and the items a response left out of its batch
+        retried_results: Dict[str, Dict[str, Any]] = {}
+        missing = [[item for item in batch if item not in answers] for batch in batches]
+        missing = [items for items in missing if items]
+        if missing:
+            print(f"   🔁 Processing {sum(map(len, missing))} unanswered items in "
+                  f"{len(missing)} batches with regular requests...")
+            retried = await asyncio.gather(*(self.process_batch(items, batch_type) for items in missing))
+            for items, results in zip(missing, retried):
+                retried_results.update(zip(items, results))
+        
+        return [
+            dict(retried_results[item]) if item in retried_results else to_result(item, answers.get(item))
+            for item in all_items
+        ]
+    
     def cleanup_progress_files(self):
         """Clean up progress files after successful completion."""
-        try:
-            if os.path.exists(self.progress_file):
-                os.remove(self.progress_file)
-            if os.path.exists(self.partial_output_file):
-                os.remove(self.partial_output_file)
-        except Exception as e:
-            print(f"⚠️ Warning: Could not clean up progress files: {e}")
+        self.close()
+        for path in (self.progress_file, self.partial_output_file):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"⚠️ Warning: Could not clean up progress files: {e}")
     
     def get_progress_summary(self) -> str:
         """Get a comprehensive summary of current progress and performance."""
-        progress = self.load_progress()
+        progress = self._load_progress_sync()
         if progress:
             memory_mb = self.get_memory_usage()
             speed = self.get_processing_speed()
@@ -614,7 +1677,7 @@ Example: makeup:2,2,3,2,0,0,0;nike_shoes:1,4,1,2,0,0,0"""
         memory_trend = "Stable"
         
         if len(self.memory_usage) > 10:
-            recent_memory = [m['memory_mb'] for m in self.memory_usage[-10:]]
+            recent_memory = [m['memory_mb'] for m in islice(self.memory_usage, len(self.memory_usage) - 10, None)]
             if max(recent_memory) - min(recent_memory) > 50:  # 50MB variation
                 memory_trend = "Fluctuating"
             elif recent_memory[-1] > recent_memory[0] * 1.5:  # 50% increase
@@ -626,4 +1689,5 @@ Example: makeup:2,2,3,2,0,0,0;nike_shoes:1,4,1,2,0,0,0"""
 ├── Memory Trend: {memory_trend}
 ├── Total Batches Processed: {len(self.batch_times)}
 ├── Rate Limit Occurrences: {self.rate_limit_occurrences}
+├── Cache Hits: {self.cache_hits}
 └── Total Wait Time: {self.total_wait_time:.1f}s"""
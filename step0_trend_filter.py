@@ -16,10 +16,17 @@ The trend filtering happens BEFORE brand filtering to reduce the dataset size ea
 import csv
 import os
 import numpy as np
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
 import argparse
 import json
 
+# orjson serializes the stats several times faster than the stdlib; fall back
+# to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def calculate_trend_slope(monthly_data: List[str]) -> float:
     """
     Calculate linear regression slope for monthly data, ignoring zeros.
@@ -30,28 +37,72 @@ def calculate_trend_slope(monthly_data: List[str]) -> float:
     Returns:
         float: Slope of the trend line (negative = declining, positive = growing)
     """
-    # Convert to numbers and filter out zeros
-    numeric_data = []
-    month_indices = []
-    
-    for i, value in enumerate(monthly_data):
-        try:
-            num = int(value)
-            if num > 0:  # Only include non-zero values
-                numeric_data.append(num)
-                month_indices.append(i)
-        except (ValueError, TypeError):
-            continue
+    # A one-row matrix through the same vectorized path the filter uses
+    return float(calculate_trend_slopes(parse_monthly_volumes([monthly_data]))[0])
+
+def _month_value(value: str) -> int:
+    """Parse one monthly search volume; unparseable values count as zero (ignored)."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+def parse_monthly_volumes(monthly_cells: List[List[str]]) -> np.ndarray:
+    """
+    Parse rows of monthly search volume strings into an integer matrix.
     
-    if len(numeric_data) < 3:
-        return 0.0  # Need at least 3 non-zero points for trend analysis
+    NumPy parses an all-integer matrix in C; only when some cell is blank or
+    not a number does it fall back to parsing cell by cell (such cells become
+    zero, which the slope calculation ignores).
     
-    # Calculate linear regression slope using numpy
+    Args:
+        monthly_cells: One list of monthly values per product, all the same length
+        
+    Returns:
+        np.ndarray: int64 matrix with one row per product and one column per month
+    """
     try:
-        slope = np.polyfit(month_indices, numeric_data, 1)[0]
-        return slope
-    except:
-        return 0.0
+        volumes = np.array(monthly_cells, dtype=np.int64)
+    except (ValueError, TypeError):
+        volumes = np.array(
+            [[_month_value(value) for value in cells] for cells in monthly_cells], dtype=np.int64
+        )
+    width = len(monthly_cells[0]) if monthly_cells else 0
+    return volumes.reshape(len(monthly_cells), width)
+
+def calculate_trend_slopes(volumes: np.ndarray) -> np.ndarray:
+    """
+    Calculate the linear regression slope of every row of a volume matrix at once,
+    ignoring zeros: one vectorized least-squares pass instead of a Python loop
+    and an np.polyfit call per product.
+    
+    Args:
+        volumes: Integer matrix with one row per product and one column per month
+        
+    Returns:
+        np.ndarray: Slope per row (0.0 where fewer than 3 months are non-zero)
+    """
+    mask = volumes > 0
+    months = np.arange(volumes.shape[1], dtype=np.int64)
+    
+    # Least-squares sums over the non-zero months of each row only
+    x = np.where(mask, months, 0)
+    y = np.where(mask, volumes, 0)
+    n = mask.sum(axis=1)
+    sum_x = x.sum(axis=1)
+    sum_y = y.sum(axis=1)
+    sum_xx = (x * x).sum(axis=1)
+    sum_xy = (x * y).sum(axis=1)
+    
+    # Closed-form slope; the sums are exact integers, so flat trends come out
+    # as exactly 0 rather than as rounding noise around it
+    numerator = n * sum_xy - sum_x * sum_y
+    denominator = n * sum_xx - sum_x * sum_x
+    
+    slopes = np.zeros(len(volumes))
+    enough = n >= 3  # Need at least 3 non-zero points for trend analysis
+    slopes[enough] = numerator[enough] / denominator[enough]
+    return slopes
 
 def filter_by_declining_trends(input_file: str, output_file: str, slope_threshold: float = 0.0) -> Dict[str, Any]:
     """
@@ -76,76 +127,100 @@ def filter_by_declining_trends(input_file: str, output_file: str, slope_threshol
     }
     
     # Read input CSV
-    with open(input_file, 'r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        fieldnames = reader.fieldnames
+    with open(input_file, 'r', newline='', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        fieldnames = next(reader, None)
         
         if not fieldnames:
             raise ValueError("CSV file has no headers")
         
-        # Identify monthly data columns (exclude Search Term and other non-monthly columns)
-        monthly_columns = [col for col in fieldnames if col not in ['Search Term', 'Brand']]
-        
-        # Prepare output data
-        filtered_products = []
-        
-        for row in reader:
-            stats['total_products'] += 1
-            
-            # Check if it's a one-word keyword (very non-specific)
-            search_term = row['Search Term'].strip()
-            if ' ' not in search_term:
-                stats['one_word_keywords'] += 1
-                stats['filtered_out_products'].append({
-                    'search_term': search_term,
-                    'slope': 0,
-                    'trend': 'one_word_keyword'
-                })
-                print(f"   🚫 ONE-WORD: {search_term} - FILTERED OUT (too non-specific)")
-                continue
-            
-            # Extract monthly data
-            monthly_data = [row[col] for col in monthly_columns]
-            
-            # Calculate trend slope
-            slope = calculate_trend_slope(monthly_data)
-            
-            # Filter based on slope
-            if slope <= slope_threshold:  # Keep declining or flat trends
-                filtered_products.append(row)
-                stats['kept_products'].append({
-                    'search_term': search_term,
-                    'slope': slope,
-                    'trend': 'declining' if slope < 0 else 'flat'
-                })
-                
-                if slope < 0:
-                    stats['declining_trends'] += 1
-                else:
-                    stats['growing_trends'] += 1
-                    
-                # Log the trend for this product
-                trend_direction = "📉 DECLINING" if slope < 0 else "➡️ FLAT"
-                print(f"   {trend_direction}: {search_term} (slope: {slope:.3f})")
-            else:
-                stats['growing_trends'] += 1
-                stats['filtered_out_products'].append({
-                    'search_term': search_term,
-                    'slope': slope,
-                    'trend': 'growing'
-                })
-                print(f"   📈 GROWING: {search_term} (slope: {slope:.3f}) - FILTERED OUT")
+        # Keep ALL original columns, filling missing values with ''
+        width = len(fieldnames)
+        rows = [
+            row + [''] * (width - len(row)) if len(row) < width else row[:width]
+            for row in reader if row
+        ]
+    
+    if 'Search Term' not in fieldnames:
+        raise ValueError("CSV file has no 'Search Term' column")
+    term_index = fieldnames.index('Search Term')
+    
+    # Identify monthly data columns (exclude Search Term and other non-monthly columns)
+    monthly_indices = [i for i, col in enumerate(fieldnames) if col not in ['Search Term', 'Brand']]
     
+    # Calculate every product's trend slope in one pass over the monthly matrix
+    volumes = parse_monthly_volumes([[row[i] for i in monthly_indices] for row in rows])
+    slopes = calculate_trend_slopes(volumes)
+    
+    # Classify every product with boolean masks over the whole column instead
+    # of branching row by row: one-word keywords are too non-specific, and of
+    # the rest only declining or flat trends are kept
+    search_terms = [row[term_index].strip() for row in rows]
+    # Plain floats for the stats, which are serialized as JSON
+    slope_values = slopes.tolist()
+    multi_word = np.char.find(np.array(search_terms, dtype=str), ' ') >= 0
+    keep = multi_word & (slopes <= slope_threshold)
+    declining = keep & (slopes < 0)
+    
+    stats['total_products'] = len(rows)
+    stats['one_word_keywords'] = int(np.count_nonzero(~multi_word))
+    stats['declining_trends'] = int(np.count_nonzero(declining))
+    # Flat trends have always been counted with the growing ones
+    stats['growing_trends'] = int(np.count_nonzero(multi_word & ~declining))
+    
+    kept_indices = np.flatnonzero(keep)
+    stats['kept_products'] = [
+        {
+            'search_term': search_terms[i],
+            'slope': slope_values[i],
+            'trend': 'declining' if declining[i] else 'flat'
+        }
+        for i in kept_indices
+    ]
+    stats['filtered_out_products'] = [
+        {
+            'search_term': search_terms[i],
+            'slope': slope_values[i],
+            'trend': 'growing'
+        }
+        if multi_word[i] else
+        {
+            'search_term': search_terms[i],
+            'slope': 0,
+            'trend': 'one_word_keyword'
+        }
+        for i in np.flatnonzero(~keep)
+    ]
+    
+    # One summary instead of a line per product; the per-product trends are
+    # in the stats (and the kept rows in the output file)
+    flat_count = len(kept_indices) - stats['declining_trends']
+    growing_count = int(np.count_nonzero(multi_word & ~keep))
+    print(f"   📉 Declining: {stats['declining_trends']} kept")
+    print(f"   ➡️ Flat: {flat_count} kept")
+    print(f"   📈 Growing: {growing_count} filtered out")
+    print(f"   🚫 One-word: {stats['one_word_keywords']} filtered out (too non-specific)")
+    print()
+
     # Write filtered results
     with open(output_file, 'w', newline='', encoding='utf-8') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(filtered_products)
+        writer = csv.writer(outfile)
+        writer.writerow(fieldnames)
+        # Kept rows stream from the parsed rows by index, with no filtered copy
+        writer.writerows(rows[i] for i in kept_indices)
     
     return stats
 
-def main():
-    """Main execution function."""
+def main(argv: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Main execution function.
+    
+    Args:
+        argv: Command line arguments (defaults to sys.argv; the pipeline passes [])
+        
+    Returns:
+        Filtering statistics, or None if the step failed
+    """
     parser = argparse.ArgumentParser(description='Filter products by declining search trends and keyword specificity')
     parser.add_argument('--input', default='search_terms_sample.csv', 
                        help='Input CSV file path')
@@ -154,7 +229,7 @@ def main():
     parser.add_argument('--slope-threshold', type=float, default=0.0,
                        help='Maximum slope to keep (default: 0.0 = only negative slopes)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     print("🔍 TREND FILTER - STEP 0")
     print("=" * 50)
@@ -180,15 +255,14 @@ def main():
         
         # Save detailed filtering statistics
         stats_file = "csv_outputs/step0-trend-filtered_stats.json"
-        stats_file_pipeline = "csv_outputs/step0_trend_stats_for_pipeline.json"  # For pipeline to read
-
-        # Save stats for immediate cleanup
-        with open(stats_file, 'w') as f:
-            json.dump(stats, f, indent=2)
 
-        # Save stats for pipeline (won't be cleaned up)
-        with open(stats_file_pipeline, 'w') as f:
-            json.dump(stats, f, indent=2)
+        # Save stats for immediate cleanup, serialized once and written in one go
+        if orjson is not None:
+            data = orjson.dumps(stats, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(stats, indent=2).encode('utf-8')
+        with open(stats_file, 'wb') as f:
+            f.write(data)
 
         print(f"📁 Filtered results saved to: {args.output}")
         print(f"📊 Detailed stats saved to: {stats_file}")
@@ -203,9 +277,12 @@ def main():
 
         print(f"🔄 Next step: Run step1_brand_identifier.py on the filtered results")
         
+        # Returned to the pipeline, which reports it without re-reading any file
+        return stats
+        
     except Exception as e:
         print(f"❌ Error during trend filtering: {e}")
-        return
+        return None
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,8 @@
 import csv
 import os
 import asyncio
-from typing import Dict, Any
-from ai_processor import AIProcessor
+from typing import Dict, Any, List, Optional
+from ai_processor import AIProcessor, json_dumps
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -14,50 +14,81 @@ CSV_FOLDER = "csv_outputs"
 OUTPUT_CSV = f"{CSV_FOLDER}/step1-brand-filtered.csv"
 NO_BRAND_CSV = f"{CSV_FOLDER}/step1-no-brand-products.csv"
 BATCH_SIZE = 20  # Increased batch size for efficiency
+MAX_CONCURRENCY = 10  # Batches in flight at once (rate limits are enforced by AIProcessor)
+PREFETCH_BATCHES = 2 * MAX_CONCURRENCY  # Batches started ahead of the oldest unsaved one
 
-def filter_no_brand_products(input_csv: str, output_csv: str) -> Dict[str, Any]:
+def write_brand_outputs(rows: List[tuple], brand_map: Dict[str, str], fieldnames: List[str],
+                        output_csv: str, no_brand_csv: str) -> Dict[str, Any]:
     """
-    Filter products with no brands from the brand_filtered.csv and save to a new CSV.
-    Returns detailed filtering statistics.
-    """
-    no_brand_rows = []
-    branded_rows = []
+    Write every row with its brand to output_csv and, in the same pass, the
+    no-brand rows to no_brand_csv.
     
-    # Read the brand_filtered.csv file
-    with open(input_csv, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            # Track which products are kept vs filtered out
-            if row['Brand'].lower() == 'no':
-                no_brand_rows.append(row)
-            else:
-                branded_rows.append(row)
+    Args:
+        rows: Input rows as (search term, *monthly data) tuples
+        brand_map: Search term -> identified brand
+        fieldnames: Output header ('Search Term', 'Brand', monthly columns...)
+        output_csv: File receiving all rows
+        no_brand_csv: File receiving only rows whose brand is "no"
+        
+    Returns:
+        Detailed filtering statistics
+    """
+    kept_products = []
+    filtered_out_products = []
     
-    # Write the filtered data to the new CSV
-    if no_brand_rows:
-        with open(output_csv, 'w', newline='', encoding='utf-8') as file:
-            # Preserve all original columns including monthly data
-            fieldnames = list(no_brand_rows[0].keys())
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(no_brand_rows)
+    # Large write buffers so rows reach disk in few big writes
+    with open(output_csv, 'w', newline='', encoding='utf-8', buffering=1 << 20) as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(fieldnames)
+        
+        no_brand_file = None
+        no_brand_writer = None
+        try:
+            for row in rows:
+                term = row[0]
+                out_row = (term, brand_map.get(term, 'ERROR_API'), *row[1:])
+                writer.writerow(out_row)
+                
+                # Track which products are kept vs filtered out
+                if out_row[1].lower() == 'no':
+                    if no_brand_writer is None:
+                        # Only create the no-brand file once there is a product to keep,
+                        # preserving all original columns including monthly data
+                        no_brand_file = open(no_brand_csv, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+                        no_brand_writer = csv.writer(no_brand_file)
+                        no_brand_writer.writerow(fieldnames)
+                    no_brand_writer.writerow(out_row)
+                    kept_products.append(term)
+                else:
+                    filtered_out_products.append(term)
+        finally:
+            if no_brand_file is not None:
+                no_brand_file.close()
     
     # Return detailed stats
     return {
-        'total_products': len(no_brand_rows) + len(branded_rows),
-        'no_brand_products': len(no_brand_rows),
-        'branded_products': len(branded_rows),
-        'kept_products': [row['Search Term'] for row in no_brand_rows],
-        'filtered_out_products': [row['Search Term'] for row in branded_rows]
+        'total_products': len(kept_products) + len(filtered_out_products),
+        'no_brand_products': len(kept_products),
+        'branded_products': len(filtered_out_products),
+        'kept_products': kept_products,
+        'filtered_out_products': filtered_out_products
     }
 
-async def main():
+async def main(no_brand_queue: Optional[asyncio.Queue] = None):
     """
     Main function to process the CSV file using AIProcessor.
+    
+    Args:
+        no_brand_queue: Optional queue that receives each saved batch's list of
+            no-brand search terms as soon as it is saved, so a downstream step
+            can start on them before this step finishes (used by pipeline.py)
+    
+    Returns:
+        Brand filtering statistics (used by pipeline.py), or False on failure
     """
     print("🎯 BRAND IDENTIFICATION SCRIPT")
     print("This script identifies brands in product search terms using AI.")
-    print(f"Using AIProcessor with batch size: {BATCH_SIZE}")
+    print(f"Using AIProcessor with batch size: {BATCH_SIZE}, concurrency: {MAX_CONCURRENCY}")
     
     # Check if OpenAI API key is set
     if not os.getenv("OPENAI_API_KEY"):
@@ -67,10 +98,10 @@ async def main():
         return False
     
     # Initialize AIProcessor
-    processor = AIProcessor("brand_identifier", batch_size=BATCH_SIZE)
+    processor = AIProcessor("brand_identifier", batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY)
     
     # Check for existing progress
-    existing_progress = processor.load_progress()
+    existing_progress = await processor.load_progress()
     
     if existing_progress:
         print(f"\n📋 EXISTING PROGRESS DETECTED!")
@@ -114,35 +145,45 @@ async def main():
             else:
                 print("❌ Invalid choice. Please enter 1, 2, 3, or 4.")
     
-    # Read the input CSV - handle the special structure
+    # Read the input CSV one row at a time; csv.reader handles quoted commas.
+    # Rows are kept as tuples with the search term first and the monthly data
+    # after it, which costs far less memory than a dict per row and lets
+    # output rows be assembled by slicing instead of column by column
     rows = []
-    with open(INPUT_CSV, 'r', encoding='utf-8') as file:
-        # Read the first line as headers
-        lines = file.readlines()
-        if len(lines) >= 2:
-            # Use the first line as headers
-            header_line = lines[0].strip()
-            headers = [h.strip() for h in header_line.split(',') if h.strip()]
+    headers = []
+    with open(INPUT_CSV, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header_row = next(reader, None)
+        if header_row is not None:
+            headers = [h.strip() for h in header_row if h.strip()]
+            width = len(headers)
+            term_index = headers.index('Search Term') if 'Search Term' in headers else 0
+            order = [term_index] + [i for i in range(width) if i != term_index]
             
-            # Process data rows starting from line 2, skip empty lines
-            for line in lines[1:]:
-                line = line.strip()
-                if line:  # Skip empty lines
-                    values = [v.strip().strip('"') for v in line.split(',')]
-                    if len(values) >= 1 and values[0]:  # Ensure we have at least the search term
-                        # Create row with ALL original columns
-                        row = {}
-                        for i, header in enumerate(headers):
-                            if i < len(values):
-                                row[header] = values[i]
-                            else:
-                                row[header] = ''  # Fill missing values with empty string
-                        rows.append(row)
+            for values in reader:
+                values = [v.strip() for v in values]
+                if values and values[0]:  # Ensure we have at least the search term
+                    # Keep ALL original columns, filling missing values with ''
+                    if len(values) < width:
+                        values += [''] * (width - len(values))
+                    rows.append(tuple(values[:width]) if term_index == 0 else tuple(values[i] for i in order))
+            headers = [headers[i] for i in order]
     
     print(f"\n📊 Found {len(rows)} search terms to process")
     
+    # Column order shared by the partial and final output files
+    output_fields = ['Search Term', 'Brand'] + headers[1:]
+    
+    # Ask the API about each distinct search term once; duplicates reuse the answer
+    first_rows = {}
+    for row in rows:
+        first_rows.setdefault(row[0], row)
+    unique_rows = list(first_rows.values())
+    if len(unique_rows) < len(rows):
+        print(f"   🔁 {len(rows) - len(unique_rows)} duplicate search terms will reuse the first result")
+    
     # Calculate total batches
-    total_batches = (len(rows) + BATCH_SIZE - 1) // BATCH_SIZE
+    total_batches = (len(unique_rows) + BATCH_SIZE - 1) // BATCH_SIZE
     
     # Initialize or resume progress
     if existing_progress:
@@ -152,125 +193,115 @@ async def main():
         print(f"🔄 Resuming from batch {start_batch + 1}/{total_batches}")
         print(f"   Already processed: {processed_count} keywords")
         
-        # Load existing partial results
-        existing_results = processor.read_partial_results(['Search Term', 'Brand'] + [h for h in headers if h != 'Search Term'])
+        # Load existing partial results; only the brand answers are needed, the
+        # monthly data comes from the input rows
+        existing_results = await processor.read_partial_results(['Search Term', 'Brand'])
+        brand_map = {result['Search Term']: result['Brand'] for result in existing_results}
         print(f"   Loaded {len(existing_results)} existing results")
     else:
         # Start fresh
         start_batch = 0
         processed_count = 0
-        existing_results = []
+        brand_map = {}
         print(f"🚀 Starting fresh processing of {total_batches} batches")
     
-    print(f"\nProcessing {len(rows)} search terms...")
+    print(f"\nProcessing {len(unique_rows)} unique search terms...")
     
     try:
-        # Process in batches
-        for i in range(start_batch, total_batches):
-            batch_start = i * BATCH_SIZE
-            batch_end = min(batch_start + BATCH_SIZE, len(rows))
-            batch = rows[batch_start:batch_end]
-            search_terms = [row['Search Term'] for row in batch]
-            
-            print(f"\n📦 Processing batch {i + 1}/{total_batches} (keywords {batch_start + 1}-{batch_end})...")
-            
+        # Keep a window of batches running ahead of the oldest unsaved one:
+        # AIProcessor's semaphore and rate limiters bound how many calls are in
+        # flight, and staged batches have their cache lookups done by the time
+        # a slot frees up. The window also caps tasks and buffered results on
+        # large inputs instead of creating one task per batch up front
+        async def identify_batch(i):
+            search_terms = [row[0] for row in unique_rows[i * BATCH_SIZE:(i + 1) * BATCH_SIZE]]
             try:
-                # Use AIProcessor to process the batch
-                batch_results = await processor.process_batch(search_terms, "brand")
-                
-                # Add monthly data to each result
-                enriched_results = []
-                for j, result in enumerate(batch_results):
-                    if j < len(batch):
-                        enriched_result = result.copy()
-                        # Add all monthly data columns
-                        for header in headers:
-                            if header != 'Search Term':
-                                enriched_result[header] = batch[j].get(header, '')
-                        enriched_results.append(enriched_result)
-                
-                # Save partial results after each batch
-                fieldnames = ['Search Term', 'Brand'] + [h for h in headers if h != 'Search Term']
-                processor.save_partial_results(enriched_results, fieldnames)
-                
-                # Update progress
-                processed_count += len(search_terms)
-                processor.save_progress(i + 1, processed_count, len(rows))
-                
-                # Show progress bar
-                progress_bar = processor.get_progress_bar(processed_count, len(rows))
-                print(f"   ✅ Batch {i + 1} completed. {progress_bar}")
-                
-                # Show performance metrics
-                speed = processor.get_processing_speed()
-                eta = processor.calculate_eta(len(rows) - processed_count)
-                print(f"   📊 Speed: {speed:.1f} items/minute, ETA: {eta}")
-                
-                # Add delay between batches to avoid rate limits
-                if i + 1 < total_batches:
-                    print(f"   ⏳ Waiting 2 seconds before next batch...")
-                    await asyncio.sleep(2)
-                    
+                return i, await processor.process_batch(search_terms, "brand"), None
             except Exception as e:
-                print(f"❌ Error in batch {i + 1}: {e}")
-                # Continue with next batch instead of crashing
-                error_results = []
-                for j, search_term in enumerate(search_terms):
-                    error_result = {
-                        'Search Term': search_term,
-                        'Brand': 'ERROR_API'
-                    }
-                    # Add monthly data
-                    if j < len(batch):
-                        for header in headers:
-                            if header != 'Search Term':
-                                error_result[header] = batch[j].get(header, '')
-                    error_results.append(error_result)
+                # Mark the batch as failed instead of crashing
+                return i, [{'Search Term': term, 'Brand': 'ERROR_API'} for term in search_terms], e
+        
+        pending = set()
+        
+        try:
+            # Handle batches as they finish, but persist them in batch order so the
+            # progress file always marks a contiguous prefix that resume can trust
+            finished = {}
+            next_batch = start_batch
+            next_start = start_batch
+            while next_batch < total_batches:
+                while next_start < min(total_batches, next_batch + PREFETCH_BATCHES):
+                    pending.add(asyncio.create_task(identify_batch(next_start)))
+                    next_start += 1
                 
-                # Save error results
-                fieldnames = ['Search Term', 'Brand'] + [h for h in headers if h != 'Search Term']
-                processor.save_partial_results(error_results, fieldnames)
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    i, batch_results, error = task.result()
+                    finished[i] = (batch_results, error)
                 
-                # Update progress
-                processed_count += len(search_terms)
-                processor.save_progress(i + 1, processed_count, len(rows))
-                continue
+                while next_batch in finished:
+                    i = next_batch
+                    batch_results, error = finished.pop(i)
+                    next_batch += 1
+                    
+                    batch_start = i * BATCH_SIZE
+                    batch_end = min(batch_start + BATCH_SIZE, len(unique_rows))
+                    batch = unique_rows[batch_start:batch_end]
+                    
+                    if error is not None:
+                        print(f"\n❌ Error in batch {i + 1}: {error}")
+                    else:
+                        print(f"\n📦 Batch {i + 1}/{total_batches} (keywords {batch_start + 1}-{batch_end})...")
+                    
+                    # Rows in output_fields order: the input row's monthly data is
+                    # carried over as one slice instead of copied column by column
+                    enriched_rows = [
+                        (row[0], result['Brand'], *row[1:])
+                        for row, result in zip(batch, batch_results)
+                    ]
+                    
+                    # Save partial results after each batch; brand_map mirrors the
+                    # file so the final output needs no second read of it
+                    await processor.save_partial_results(enriched_rows, output_fields)
+                    brand_map.update((row[0], row[1]) for row in enriched_rows)
+                    if no_brand_queue is not None:
+                        no_brand_queue.put_nowait([row[0] for row in enriched_rows if row[1].lower() == 'no'])
+                    
+                    # Update progress
+                    processed_count += len(batch)
+                    await processor.save_progress(i + 1, processed_count, len(unique_rows))
+                    
+                    if error is None:
+                        # Show progress bar
+                        progress_bar = processor.get_progress_bar(processed_count, len(unique_rows))
+                        print(f"   ✅ Batch {i + 1} completed. {progress_bar}")
+                        
+                        # Show performance metrics
+                        speed = processor.get_processing_speed()
+                        eta = processor.calculate_eta(len(unique_rows) - processed_count)
+                        print(f"   📊 Speed: {speed:.1f} items/minute, ETA: {eta}")
+        finally:
+            # Stop outstanding API calls if we bail out early
+            for task in pending:
+                task.cancel()
         
         # All batches completed successfully!
         print(f"\n✅ All {total_batches} batches completed successfully!")
         
-        # Read all results from partial file
-        all_results = processor.read_partial_results(['Search Term', 'Brand'] + [h for h in headers if h != 'Search Term'])
-        
-        # Write the final enriched data to output CSV
-        with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as file:
-            # Include Search Term first, then Brand, then all monthly data columns
-            fieldnames = ['Search Term', 'Brand'] + [h for h in headers if h != 'Search Term']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_results)
-        
+        # Write all results and the no-brand subset in one pass, in a worker thread
+        print(f"\n🔍 Writing results and filtering products with no brands...")
+        brand_stats = await asyncio.to_thread(
+            write_brand_outputs, rows, brand_map, output_fields, OUTPUT_CSV, NO_BRAND_CSV
+        )
         print(f"✅ Processing complete! Results saved to {OUTPUT_CSV}")
         
-        # Clean up progress files on successful completion
+        # Clean up progress files only once both outputs are on disk
         processor.cleanup_progress_files()
         
-        # Filter products with no brands
-        print(f"\n🔍 Filtering products with no brands...")
-        brand_stats = filter_no_brand_products(OUTPUT_CSV, NO_BRAND_CSV)
-        
-        # Save final brand stats for pipeline summary
-        brand_stats = filter_no_brand_products(OUTPUT_CSV, NO_BRAND_CSV)
+        # Save final brand stats (orjson when available, compact)
         stats_file = NO_BRAND_CSV.replace('.csv', '_stats.json')
-        stats_file_pipeline = "csv_outputs/step1_brand_stats_for_pipeline.json"  # For pipeline to read
-        
-        import json
-        with open(stats_file, 'w') as f:
-            json.dump(brand_stats, f, indent=2)
-        
-        # Save stats for pipeline (won't be cleaned up)
-        with open(stats_file_pipeline, 'w') as f:
-            json.dump(brand_stats, f, indent=2)
+        with open(stats_file, 'wb') as f:
+            f.write(json_dumps(brand_stats))
         
         print(f"📁 Files created:")
         print(f"  - {OUTPUT_CSV} (all results)")
@@ -285,7 +316,7 @@ async def main():
         except Exception as e:
             print(f"   ⚠️ Warning: Could not remove stats file: {e}")
         
-        return True
+        return brand_stats
         
     except Exception as e:
         print(f"\n❌ Critical error occurred: {e}")
@@ -293,6 +324,8 @@ async def main():
         print(f"📊 Current progress:")
         print(processor.get_progress_summary())
         return False
+    finally:
+        await processor.aclose()
 
 if __name__ == "__main__":
     # Run the async main function
@@ -1,7 +1,11 @@
+import argparse
 import csv
 import os
 import asyncio
-from ai_processor import AIProcessor
+from itertools import count, islice
+from operator import itemgetter
+from typing import Iterator, List, Tuple
+from ai_processor import AIProcessor, ASSESSMENT_FIELDS, DEFAULT_ASSESSMENT, json_dumps
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,16 +16,189 @@ INPUT_CSV = "csv_outputs/step1-no-brand-products.csv"  # Use output from brand i
 CSV_FOLDER = "csv_outputs"
 ASSESSED_CSV = f"{CSV_FOLDER}/step2-products-assessed.csv"
 BATCH_SIZE = 20  # Increased batch size for efficiency
+MAX_INFLIGHT = int(os.getenv("OPENAI_MAX_INFLIGHT", "10"))  # Batches assessed at once (AIProcessor's semaphore)
 
+# Input columns left out of the assessed output
+DROPPED_FIELDS = ('Brand',)
 
+# Pulls the assessment values out of a result dict in ASSESSMENT_FIELDS order
+assessment_values = itemgetter(*ASSESSMENT_FIELDS)
 
-async def main():
+# Search term of an input row (always its first value)
+search_term_of = itemgetter(0)
+
+# The default assessment as output-row values, shared by every row of a failed batch
+DEFAULT_VALUES = assessment_values(DEFAULT_ASSESSMENT)
+
+def is_specific(search_term: str) -> bool:
+    """Whether a search term has more than one word (step 0 drops one-word terms as too non-specific)."""
+    return ' ' in search_term.strip()
+
+def _term_first_order(header: List[str]) -> List[int]:
+    """
+    Column positions that put the search term first and keep the rest in
+    order, leaving out DROPPED_FIELDS.
+    """
+    term_index = header.index('Search Term') if 'Search Term' in header else 0
+    return [term_index] + [
+        i for i, name in enumerate(header) if i != term_index and name not in DROPPED_FIELDS
+    ]
+
+def read_input_fields(path: str) -> List[str]:
+    """
+    Return the header row of a CSV file in the order iter_product_batches
+    yields values: the search term first, then every other kept column.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        header = next(csv.reader(file), [])
+    return [header[i] for i in _term_first_order(header)]
+
+def count_products(path: str) -> int:
+    """Count the data rows of a CSV file without keeping any of them."""
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        # Blank lines are skipped when reading batches, so they are not counted either
+        return sum(1 for row in reader if row)
+
+def iter_product_batches(path: str, batch_size: int) -> Iterator[List[Tuple[str, ...]]]:
+    """
+    Stream a CSV file as lists of up to batch_size row tuples.
+    
+    Rows are plain tuples in read_input_fields order rather than a dict per
+    row, so output rows can be assembled by slicing. Only one batch is held
+    in memory at a time, and the first batch is ready as soon as its rows
+    are parsed rather than after the whole file is read.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        width = len(header)
+        order = _term_first_order(header)
+        if order == list(range(width)):
+            take = None
+        elif len(order) > 1:
+            # Columns are picked in one C-level call rather than one by one, so
+            # the monthly data passes through without per-column Python work
+            take = itemgetter(*order)
+        else:
+            take = lambda values: (values[order[0]],)
+        
+        batch = []
+        for values in reader:
+            if not values:
+                continue
+            # Preserve all original data from the CSV, filling missing values with ''
+            if len(values) < width:
+                values += [''] * (width - len(values))
+            batch.append(take(values) if take else tuple(values[:width]))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def rewrite_results(source: str, destination: str, fieldnames: List[str]) -> None:
+    """
+    Copy a results CSV into fieldnames column order, one row at a time.
+    
+    Columns missing from the source are written as '', and a missing source
+    (no rows were ever saved) gives a header-only file.
+    """
+    with open(destination, 'w', newline='', encoding='utf-8') as dst:
+        # Columns outside fieldnames (a stale Brand column, say) are dropped
+        # by the writer itself rather than by rebuilding every row dict
+        writer = csv.DictWriter(dst, fieldnames=fieldnames, restval='', extrasaction='ignore')
+        writer.writeheader()
+        try:
+            with open(source, 'r', newline='', encoding='utf-8') as src:
+                # Rows stream straight from reader to writer, never held as a list
+                writer.writerows(csv.DictReader(src))
+        except FileNotFoundError:
+            pass
+
+
+async def prefetch_assessments(terms_queue: asyncio.Queue) -> int:
+    """
+    Assess search terms while an upstream step is still producing them.
+    
+    pipeline.py runs this alongside brand identification, so product
+    assessments are in flight while brand batches are. Answers land in the
+    response cache, so main() later finds them there and only asks the API
+    about whatever the prefetch missed. Failures are left for main() to retry.
+    One-word terms are skipped, as main() gives them the default assessment
+    without asking. Requests draw on the same rate budget as the brand step's
+    processor (see get_shared_rate_limiters).
+    
+    Args:
+        terms_queue: Queue of search term lists, closed by putting None
+        
+    Returns:
+        Number of search terms assessed
+    """
+    processor = None
+    
+    async def assess(terms):
+        try:
+            await processor.process_batch(terms, "product")
+            return len(terms)
+        except Exception as e:
+            print(f"⚠️ Prefetch of {len(terms)} products failed, step 2 will retry them: {e}")
+            return 0
+    
+    assessed = 0
+    pending = set()
+    waiting = []
+    try:
+        # Built in here so that a processor that cannot start (no API key,
+        # say) only costs the prefetch, never the brand step running beside it
+        processor = AIProcessor("product_validator", batch_size=BATCH_SIZE, max_concurrency=MAX_INFLIGHT)
+        
+        while True:
+            terms = await terms_queue.get()
+            if terms is not None:
+                waiting.extend(term for term in terms if is_specific(term))
+            # Regroup into full batches; the last partial one goes once the queue closes
+            while len(waiting) >= BATCH_SIZE or (terms is None and waiting):
+                batch, waiting = waiting[:BATCH_SIZE], waiting[BATCH_SIZE:]
+                if len(pending) >= MAX_INFLIGHT:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    assessed += sum(task.result() for task in done)
+                pending.add(asyncio.create_task(assess(batch)))
+            if terms is None:
+                break
+        
+        if pending:
+            done, pending = await asyncio.wait(pending)
+            assessed += sum(task.result() for task in done)
+        return assessed
+    except Exception as e:
+        print(f"⚠️ Product prefetch stopped, step 2 will assess the rest: {e}")
+        return assessed
+    finally:
+        # Stop outstanding API calls if we bail out early
+        for task in pending:
+            task.cancel()
+        if processor is not None:
+            await processor.aclose()
+
+
+async def main(use_cache: bool = True, use_batch_api: bool = False):
     """
     Main function to validate products using AIProcessor.
+    
+    Args:
+        use_cache: Reuse cached assessments from earlier runs (False re-assesses
+            every product and refreshes the cache)
+        use_batch_api: Assess every remaining product in one OpenAI Batch API job
+            (half the cost, up to 24h turnaround) instead of through live requests
+    
+    Returns:
+        Assessment statistics (used by pipeline.py), or a falsy value on failure
     """
     print("🚀 PRODUCT VALIDATION SCRIPT")
     print("This script will automatically assess products using AI.")
-    print(f"Using AIProcessor with batch size: {BATCH_SIZE}")
+    print(f"Using AIProcessor with batch size: {BATCH_SIZE}, in flight: {MAX_INFLIGHT}")
     print(f"Input file: {INPUT_CSV}")
     
     # Check if OpenAI API key is set
@@ -37,10 +214,12 @@ async def main():
         return
     
     # Initialize AIProcessor
-    processor = AIProcessor("product_validator", batch_size=BATCH_SIZE)
+    processor = AIProcessor("product_validator", batch_size=BATCH_SIZE, max_concurrency=MAX_INFLIGHT, use_cache=use_cache)
+    if not use_cache:
+        print("♻️ Response cache disabled: every product will be re-assessed")
     
     # Check for existing progress
-    existing_progress = processor.load_progress()
+    existing_progress = await processor.load_progress()
     
     if existing_progress:
         print(f"\n📋 EXISTING PROGRESS DETECTED!")
@@ -84,18 +263,20 @@ async def main():
             else:
                 print("❌ Invalid choice. Please enter 1, 2, 3, or 4.")
     
-    # Read the products with monthly data
-    products = []
-    with open(INPUT_CSV, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            # Preserve all original data from the CSV
-            products.append(row)
+    # Products are streamed batch by batch below; only count them up front
+    # so progress and ETA have a total
+    input_fields = read_input_fields(INPUT_CSV)
+    total_products = count_products(INPUT_CSV)
     
-    print(f"\n📊 Found {len(products)} products to assess.")
+    print(f"\n📊 Found {total_products} products to assess.")
+    
+    # Column order is fixed by the input header, so work it out once. Input
+    # rows are read without the Brand column, so the partial results file is
+    # already laid out like the final output
+    output_fields = ['Search Term', *ASSESSMENT_FIELDS, *input_fields[1:]]
     
     # Calculate total batches
-    total_batches = (len(products) + BATCH_SIZE - 1) // BATCH_SIZE
+    total_batches = (total_products + BATCH_SIZE - 1) // BATCH_SIZE
     
     # Initialize or resume progress
     if existing_progress:
@@ -106,10 +287,7 @@ async def main():
         print(f"   Already processed: {processed_count} keywords")
         
         # Load existing partial results
-        existing_results = processor.read_partial_results([
-            'Search Term', 'Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save', 
-            'Gated', 'Electronics_Batteries', 'Insurance_Gov'
-        ])
+        existing_results = await processor.read_partial_results(['Search Term', *ASSESSMENT_FIELDS])
         print(f"   Loaded {len(existing_results)} existing results")
     else:
         # Start fresh
@@ -122,148 +300,174 @@ async def main():
     print(f"\n🔍 STEP 1: Assessing all products using AI...")
     
     try:
-        # Process in batches
-        for i in range(start_batch, total_batches):
-            batch_start = i * BATCH_SIZE
-            batch_end = min(batch_start + BATCH_SIZE, len(products))
-            batch_products = products[batch_start:batch_end]
-            search_terms = [product['Search Term'] for product in batch_products]
-            
-            print(f"\n📦 Processing batch {i + 1}/{total_batches} (products {batch_start + 1}-{batch_end})...")
-            
+        # An offline run answers every remaining product from a single Batch API
+        # job up front; the stages below then write those answers exactly like
+        # live ones, so resume, progress and output work the same either way
+        batch_job_answers = None
+        if use_batch_api:
+            remaining_terms = await asyncio.to_thread(
+                lambda: [search_term_of(product)
+                         for batch in islice(iter_product_batches(INPUT_CSV, BATCH_SIZE), start_batch, None)
+                         for product in batch if is_specific(search_term_of(product))]
+            )
+            print(f"📤 Assessing {len(remaining_terms)} products with the OpenAI Batch API (can take up to 24h)...")
+            batch_job_results = await processor.submit_batch_job(remaining_terms, "product")
+            batch_job_answers = dict(zip(remaining_terms, batch_job_results))
+        
+        # Input that skipped step 0 can still hold one-word terms; they get the
+        # default ratings without an API call, as step 0 would have dropped them
+        one_word_skipped = 0
+        
+        async def assess(search_terms):
+            nonlocal one_word_skipped
+            specific = [term for term in search_terms if is_specific(term)]
+            one_word_skipped += len(search_terms) - len(specific)
+            if batch_job_answers is not None:
+                assessed = iter([batch_job_answers[term] for term in specific])
+            else:
+                assessed = iter(await processor.process_batch(specific, "product") if specific else [])
+            return [next(assessed) if is_specific(term) else dict(DEFAULT_ASSESSMENT) for term in search_terms]
+        
+        # The API stage keeps up to MAX_INFLIGHT batches being assessed while the
+        # writer stage enriches and saves finished ones, so CSV writes no longer
+        # leave the API idle. The queue holds the assessment tasks in batch order
+        # and the writer awaits them in that order, so the progress file always
+        # marks a contiguous prefix that resume can trust
+        results_q = asyncio.Queue(maxsize=MAX_INFLIGHT)
+        
+        async def api_stage():
+            # Process in batches, skipping the ones a previous run completed
             try:
-                # Use AIProcessor to process the batch
-                batch_assessments = await processor.process_batch(search_terms, "product")
+                batches = islice(iter_product_batches(INPUT_CSV, BATCH_SIZE), start_batch, None)
+                for i in count(start_batch):
+                    # Parse each batch in a worker thread so reading the CSV never
+                    # stalls the API calls and writes running on the event loop
+                    batch_products = await asyncio.to_thread(next, batches, None)
+                    if batch_products is None:
+                        break
+                    # Rows start with the search term, so one C-level map pulls them out
+                    search_terms = list(map(search_term_of, batch_products))
+                    # AIProcessor's semaphore bounds the calls actually in flight
+                    task = asyncio.create_task(assess(search_terms))
+                    await results_q.put((i, batch_products, task))
+            except Exception as e:
+                # Hand input errors to the writer so the run stops instead of hanging
+                await results_q.put(e)
+                return
+            await results_q.put(None)
+        
+        async def writer_stage():
+            nonlocal processed_count
+            while (item := await results_q.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                i, batch_products, task = item
+                # Batches are written in order, so the rows written so far are this batch's offset
+                print(f"\n📦 Processing batch {i + 1}/{total_batches} (products {processed_count + 1}-{processed_count + len(batch_products)})...")
                 
-                # Add assessment data to products and preserve monthly data
-                enriched_results = []
-                for j, (product, assessment) in enumerate(zip(batch_products, batch_assessments)):
-                    enriched_result = assessment.copy()
-                    enriched_result['Search Term'] = product['Search Term']
+                try:
+                    # Wait for this batch's assessment from the API stage
+                    batch_assessments = await task
+                    # AIProcessor has already range-checked every rating; one check per
+                    # batch guards against zip() silently dropping unmatched rows
+                    if len(batch_assessments) != len(batch_products):
+                        raise ValueError(f"got {len(batch_assessments)} assessments for {len(batch_products)} products")
                     
-                    # Seasonality will be calculated by AI (restored to original approach)
-                    print(f"   🔬 {product['Search Term']}: Seasonality will be assessed by AI")
+                    # Add assessment data to products and preserve monthly data. Rows are
+                    # in output_fields order: the monthly data columns are carried over
+                    # as one slice of the input row. Progress is reported once per batch
+                    # below rather than with a line per product
+                    enriched_results = [
+                        (product[0], *assessment_values(assessment), *product[1:])
+                        for product, assessment in zip(batch_products, batch_assessments)
+                    ]
                     
-                    # Add all monthly data columns
-                    for key, value in product.items():
-                        if key != 'Search Term':
-                            enriched_result[key] = value
+                    # Save partial results after each batch
+                    await processor.save_partial_results(enriched_results, output_fields)
                     
-                    enriched_results.append(enriched_result)
-                
-                # Save partial results after each batch
-                fieldnames = [
-                    'Search Term', 'Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save', 
-                    'Gated', 'Electronics_Batteries', 'Insurance_Gov'
-                ] + [key for key in batch_products[0].keys() if key != 'Search Term']
-                
-                processor.save_partial_results(enriched_results, fieldnames)
-                
-                # Update progress
-                processed_count += len(search_terms)
-                processor.save_progress(i + 1, processed_count, len(products))
-                
-                # Show progress bar
-                progress_bar = processor.get_progress_bar(processed_count, len(products))
-                print(f"   ✅ Batch {i + 1} completed. {progress_bar}")
-                
-                # Show performance metrics
-                speed = processor.get_processing_speed()
-                eta = processor.calculate_eta(len(products) - processed_count)
-                print(f"   📊 Speed: {speed:.1f} items/minute, ETA: {eta}")
-                
-                # Show sample assessment for this batch
-                if enriched_results:
-                    sample = enriched_results[0]
-                    print(f"   📝 Sample assessment: {sample['Search Term']}")
-                    print(f"      Seasonal={sample['Seasonal']}, Specificity={sample['Specificity']}, Commodity={sample['Commodity']}, Subscribe&Save={sample['Subscribe&Save']}")
-                    print(f"      Gated={sample['Gated']}, Electronics={sample['Electronics_Batteries']}, Insurance={sample['Insurance_Gov']}")
-                
-                # Small delay between batches to be respectful to the API
-                if i + 1 < total_batches:
-                    print("   ⏳ Waiting 2 seconds before next batch...")
-                    await asyncio.sleep(2)
+                    # Update progress
+                    processed_count += len(batch_products)
+                    await processor.save_progress(i + 1, processed_count, total_products)
                     
-            except Exception as e:
-                print(f"❌ Error in batch {i + 1}: {e}")
-                # Continue with next batch instead of crashing
-                error_results = []
-                for j, product in enumerate(batch_products):
-                    # Use default values for error cases (AI will assess seasonality normally)
-                    error_result = {
-                        'Search Term': product['Search Term'],
-                        'Seasonal': 3, 'Specificity': 3, 'Commodity': 3, 
-                        'Subscribe&Save': 2, 'Gated': 0, 'Electronics_Batteries': 0, 
-                        'Insurance_Gov': 0
-                    }
-                    # Add monthly data
-                    for key, value in product.items():
-                        if key != 'Search Term':
-                            error_result[key] = value
-                    error_results.append(error_result)
-                
-                # Save error results
-                fieldnames = [
-                    'Search Term', 'Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save', 
-                    'Gated', 'Electronics_Batteries', 'Insurance_Gov'
-                ] + [key for key in batch_products[0].keys() if key != 'Search Term']
-                
-                processor.save_partial_results(error_results, fieldnames)
+                    # Show progress bar
+                    progress_bar = processor.get_progress_bar(processed_count, total_products)
+                    print(f"   ✅ Batch {i + 1} completed. {progress_bar}")
+                    
+                    # Show performance metrics
+                    speed = processor.get_processing_speed()
+                    eta = processor.calculate_eta(total_products - processed_count)
+                    print(f"   📊 Speed: {speed:.1f} items/minute, ETA: {eta}")
+                    
+                    # Show sample assessment for this batch
+                    if enriched_results:
+                        # Read the sample from its output row rather than by field name
+                        term, seasonal, specificity, commodity, subscribe_save, gated, electronics, insurance = enriched_results[0][:8]
+                        print(f"   📝 Sample assessment: {term}")
+                        print(f"      Seasonal={seasonal}, Specificity={specificity}, Commodity={commodity}, Subscribe&Save={subscribe_save}")
+                        print(f"      Gated={gated}, Electronics={electronics}, Insurance={insurance}")
                 
-                # Update progress
-                processed_count += len(search_terms)
-                processor.save_progress(i + 1, processed_count, len(products))
-                continue
+                except Exception as e:
+                    print(f"❌ Error in batch {i + 1}: {e}")
+                    # Continue with next batch instead of crashing
+                    # Use default values for error cases (AI will assess seasonality normally);
+                    # rows have the same shape as successful ones
+                    error_results = [(product[0], *DEFAULT_VALUES, *product[1:]) for product in batch_products]
+                    
+                    # Save error results
+                    await processor.save_partial_results(error_results, output_fields)
+                    
+                    # Update progress
+                    processed_count += len(batch_products)
+                    await processor.save_progress(i + 1, processed_count, total_products)
+        
+        producer = asyncio.create_task(api_stage())
+        try:
+            await writer_stage()
+        finally:
+            # Stop the API stage and any queued assessments if we bail out early
+            producer.cancel()
+            while not results_q.empty():
+                item = results_q.get_nowait()
+                if isinstance(item, tuple):
+                    item[2].cancel()
         
         # All batches completed successfully!
         print(f"\n✅ All {total_batches} batches completed successfully!")
-        
-        # Read all results from partial file - include ALL columns to preserve monthly data
-        all_results = processor.read_partial_results([
-            'Search Term', 'Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save', 
-            'Gated', 'Electronics_Batteries', 'Insurance_Gov'
-        ] + [key for key in products[0].keys() if key not in ['Search Term', 'Brand']])
+        if processor.cache_hits:
+            print(f"   ♻️ {processor.cache_hits} assessments came from the response cache instead of the API")
+        if one_word_skipped:
+            print(f"   🚫 {one_word_skipped} one-word products got default ratings without an API call")
         
         # Step 2: Save final results
         print(f"\n🔍 STEP 2: Saving final results...")
         
-        # Preserve ALL original data plus add AI assessments, but remove Brand column
-        filtered_products_clean = []
-        for result in all_results:
-            clean_product = {k: v for k, v in result.items() if k != 'Brand'}
-            filtered_products_clean.append(clean_product)
-        
-        with open(ASSESSED_CSV, 'w', newline='', encoding='utf-8') as file:
-            # Define the final column order: Search Term + AI assessments + monthly data (no Brand column)
-            fieldnames = [
-                'Search Term',
-                'Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save', 'Gated', 'Electronics_Batteries', 'Insurance_Gov'
-            ]
-            
-            # Add monthly data columns dynamically
-            if filtered_products_clean:
-                for key in filtered_products_clean[0].keys():
-                    if key not in fieldnames:
-                        fieldnames.append(key)
-            
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(filtered_products_clean)
+        # The partial file already holds every row in the final column order
+        # (Search Term + AI assessments + monthly data, no Brand column), so it
+        # is moved into place instead of being read back and written out again
+        if not processor.finalize_partial_results(ASSESSED_CSV, output_fields):
+            # Partial file left in an older layout by a previous version: rewrite it
+            await asyncio.to_thread(rewrite_results, processor.partial_output_file, ASSESSED_CSV, output_fields)
         
         print(f"✅ Processing complete! Results saved to {ASSESSED_CSV}")
         
         # Clean up progress files on successful completion
         processor.cleanup_progress_files()
         
-        # Save final assessment stats for pipeline summary
+        # Save final assessment stats
+        # Every product is written, so the processed count is the row count;
+        # only the few sample rows are read back
+        with open(ASSESSED_CSV, 'r', newline='', encoding='utf-8') as file:
+            sample_results = list(islice(csv.DictReader(file), 3))
+        
         assessment_stats = {
-            'total_products_assessed': len(all_results),
-            'products_saved': len(filtered_products_clean),
+            'total_products_assessed': processed_count,
+            'products_saved': processed_count,
+            'cached_assessments': processor.cache_hits,
             'filtering_status': 'DISABLED - All products with assessments are saved',
-            'assessment_fields': ['Seasonal', 'Specificity', 'Commodity', 'Subscribe&Save', 'Gated', 'Electronics_Batteries', 'Insurance_Gov'],
+            'assessment_fields': list(ASSESSMENT_FIELDS),
             'sample_assessments': []
         }
-        for i, result in enumerate(all_results[:3]):
+        for i, result in enumerate(sample_results):
             assessment_stats['sample_assessments'].append({
                 'search_term': result['Search Term'],
                 'seasonal': result.get('Seasonal', 'N/A'),
@@ -271,16 +475,10 @@ async def main():
                 'commodity': result.get('Commodity', 'N/A'),
                 'subscribe_save': result.get('Subscribe&Save', 'N/A')
             })
+        # Save final assessment stats (orjson when available, compact)
         stats_file = ASSESSED_CSV.replace('.csv', '_stats.json')
-        stats_file_pipeline = "csv_outputs/step2_assessment_stats_for_pipeline.json"  # For pipeline to read
-        
-        import json
-        with open(stats_file, 'w') as f:
-            json.dump(assessment_stats, f, indent=2)
-        
-        # Save stats for pipeline (won't be cleaned up)
-        with open(stats_file_pipeline, 'w') as f:
-            json.dump(assessment_stats, f, indent=2)
+        with open(stats_file, 'wb') as f:
+            f.write(json_dumps(assessment_stats))
         
         print(f"🎉 ASSESSMENT COMPLETE!")
         print(f"📁 Files created:")
@@ -294,7 +492,7 @@ async def main():
         except Exception as e:
             print(f"   ⚠️ Warning: Could not remove stats file: {e}")
         
-        return True
+        return assessment_stats
         
     except Exception as e:
         print(f"\n❌ Critical error occurred: {e}")
@@ -302,7 +500,16 @@ async def main():
         print(f"📊 Current progress:")
         print(processor.get_progress_summary())
         return False
+    finally:
+        await processor.aclose()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Assess products for e-commerce potential using AI')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore cached assessments and re-validate every product')
+    parser.add_argument('--batch', action='store_true',
+                       help='Assess products with the OpenAI Batch API (half the cost, up to 24h turnaround)')
+    args = parser.parse_args()
+    
     # Run the async main function
-    asyncio.run(main())
+    asyncio.run(main(use_cache=not args.no_cache, use_batch_api=args.batch))
@@ -4,41 +4,190 @@ Test script for seasonality calculation logic.
 This allows us to test and refine the algorithm without making API calls.
 """
 
+import bisect
 import csv
+import functools
 import os
 
-def calculate_linear_trend(x_values, y_values):
+import numpy as np
+
+def _design_constants(n):
+    """
+    Month indices 0..n-1, their mean and their sum of squared deviations.
+    
+    These only depend on the series length, so they come from _TREND_CONSTANTS
+    for the usual 1-4 years of monthly data.
+    
+    Args:
+        n: Number of months in the series
+        
+    Returns:
+        tuple: (month index array, x mean, sum((i - x_mean) ** 2))
+    """
+    constants = _TREND_CONSTANTS.get(n)
+    if constants is None:
+        months = np.arange(n, dtype=np.float64)
+        months.flags.writeable = False  # Shared by every caller with this length
+        constants = (months, (n - 1) / 2, n * (n * n - 1) / 12.0)
+    return constants
+
+# Trend-fit constants for the common series lengths, built once at import
+_TREND_CONSTANTS = {}
+_TREND_CONSTANTS.update((n, _design_constants(n)) for n in (12, 24, 36, 48))
+
+def _trend_range(y_values):
     """
-    Calculate linear trend line using least squares regression.
+    Linear trend for y values at x = 0, 1, ..., n-1 (consecutive months),
+    using least squares regression.
+    
+    The x mean and the x sum of squares only depend on n, so they are
+    closed-form instead of a pass over the data.
     
     Args:
-        x_values: List of x coordinates (month numbers)
         y_values: List of y coordinates (search volumes)
         
     Returns:
         tuple: (slope, intercept) for line y = mx + b
     """
-    n = len(x_values)
+    n = len(y_values)
     if n < 2:
         return 0, 0
     
-    # Calculate means
-    x_mean = sum(x_values) / n
-    y_mean = sum(y_values) / n
+    y = np.asarray(y_values, dtype=np.float64)
+    months, x_mean, denominator = _design_constants(n)
+    y_mean = y.mean()
+    numerator = months @ y - n * x_mean * y_mean
+    
+    slope = float(numerator / denominator)
+    intercept = float(y_mean - slope * x_mean)
+    return slope, intercept
+
+def detrend(numeric_data):
+    """
+    Fit a linear trend over consecutive months and remove it.
     
-    # Calculate slope (m) using least squares formula
-    numerator = sum((x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(n))
-    denominator = sum((x_values[i] - x_mean) ** 2 for i in range(n))
+    Both algorithms score these residuals, so a caller running both can
+    detrend once and hand the same residuals to each *_from_residuals scorer.
     
-    if denominator == 0:
-        return 0, y_mean
+    Args:
+        numeric_data: Monthly search volumes as numbers (see _monthly_numbers)
+        
+    Returns:
+        tuple: (slope, intercept, residuals) with residuals as a float64 array
+    """
+    # Step 1: Calculate linear trend (y = mx + b) over consecutive months
+    slope, intercept = _trend_range(numeric_data)
     
-    slope = numerator / denominator
+    # Step 2: Remove trend (detrend the data), all months at once
+    months = _design_constants(len(numeric_data))[0]
+    residuals = np.asarray(numeric_data, dtype=np.float64) - (slope * months + intercept)
+    return slope, intercept, residuals
+
+def _month_number(value):
+    """Parse one monthly search volume; values int() rejects count as zero."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+def _monthly_numbers(monthly_data):
+    """
+    Convert monthly search volumes to an integer array, handling missing data.
     
-    # Calculate intercept (b) using y = mx + b
-    intercept = y_mean - slope * x_mean
+    NumPy casts a list of ints or numeric strings in one C-level pass with
+    int() semantics; only when some value is blank, not a whole number or
+    missing does it fall back to parsing value by value (such values become 0).
     
-    return slope, intercept
+    Args:
+        monthly_data: List of monthly search volume numbers (ints or strings)
+        
+    Returns:
+        np.ndarray: int64 array with one value per month
+    """
+    values = np.asarray(monthly_data)
+    # NaN (and inf) floats would cast to garbage rather than fail, so they
+    # take the per-value path like any other unparseable value
+    kind = values.dtype.kind
+    if values.ndim == 1 and (kind in 'biuUS' or (kind == 'f' and np.isfinite(values).all())):
+        try:
+            return values.astype(np.int64)
+        except (ValueError, TypeError):
+            pass
+    return np.array([_month_number(value) for value in monthly_data], dtype=np.int64)
+
+@functools.lru_cache(maxsize=None)
+def _month_positions(n):
+    """
+    Month position (0=Jan, 1=Feb, etc.) of each of n consecutive months and
+    how many of the n months fall on each position.
+    
+    Args:
+        n: Number of months in the series
+        
+    Returns:
+        tuple: (positions, counts) as an int array of length n and a float
+            array of length 12
+    """
+    positions = np.arange(n) % 12
+    positions.flags.writeable = False  # Cached and shared by every caller
+    counts = np.bincount(positions, minlength=12).astype(np.float64)
+    counts.flags.writeable = False
+    return positions, counts
+
+def _monthly_averages(residuals):
+    """
+    Average residual for each month position across years.
+    
+    np.bincount sums the residuals of each month position in one pass, with
+    no per-month grouping; a partial last year simply adds fewer values.
+    
+    Args:
+        residuals: float64 array of detrended values, at least 12 long
+        
+    Returns:
+        tuple: (averages, positions, counts) as returned by _month_positions,
+            with averages as a float64 array of length 12
+    """
+    positions, counts = _month_positions(len(residuals))
+    averages = np.bincount(positions, weights=residuals, minlength=12) / counts
+    return averages, positions, counts
+
+def _memoize_by_values(func):
+    """
+    Memoize a seasonality function of one monthly_data sequence.
+    
+    Scores are deterministic, so repeated calls with the same monthly values
+    (as a list or a tuple) are answered from an LRU cache keyed by the values.
+    """
+    cached = functools.lru_cache(maxsize=4096)(func)
+    
+    @functools.wraps(func)
+    def wrapper(monthly_data):
+        try:
+            return cached(tuple(monthly_data))
+        except TypeError:
+            return func(monthly_data)  # Unhashable values: compute directly
+    
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+# Seasonal strength bounds of the CURRENT algorithm's scores, lowest first:
+#   < 1.0 -> 1  Low seasonality (< 1.0 normalized)
+#   < 2.0 -> 2  Low-medium seasonality (1.0-2.0)
+#   < 4.0 -> 3  Medium seasonality (2.0-4.0)
+#   < 6.0 -> 4  Medium-high seasonality (4.0-6.0)
+#   else  -> 5  High seasonality (> 6.0)
+_CURRENT_STRENGTH_BOUNDS = (1.0, 2.0, 4.0, 6.0)
+
+# Seasonal score bounds of the NEW algorithm's scores, lowest first.
+# Ultra-fine-tuned so ONLY sunscreen (0.839) gets 5:
+#   > 1.13  -> 1  No seasonal pattern (electric_toothbrush: 1.133)
+#   > 1.09  -> 2  Weak seasonal pattern (electric_toothbrush should be 2)
+#   > 0.863 -> 3  Moderate seasonal pattern (toothpaste: 0.865, body_wash: 1.095)
+#   > 0.84  -> 4  Strong seasonal pattern
+#   else    -> 5  Very strong seasonal pattern (ONLY sunscreen: 0.839)
+_NEW_SCORE_BOUNDS = (0.84, 0.863, 1.09, 1.13)
 
 # CURRENT PRODUCT VALIDATOR LOGIC (PRESERVED)
 def calculate_seasonality_from_residuals_current(detrended_data):
@@ -56,34 +205,23 @@ def calculate_seasonality_from_residuals_current(detrended_data):
     if len(detrended_data) < 12:
         return 1  # Need at least 12 months for seasonal analysis
     
-    # Group residuals by month position (0=Jan, 1=Feb, etc.)
-    months_per_year = 12
-    monthly_groups = [[] for _ in range(months_per_year)]
-    
-    for i, value in enumerate(detrended_data):
-        month_position = i % months_per_year
-        monthly_groups[month_position].append(value)
+    # Calculate average residual for each month across all years; with at
+    # least 12 values every month position has data
+    monthly_averages = _monthly_averages(np.asarray(detrended_data, dtype=np.float64))[0]
     
-    # Calculate average residual for each month across all years
-    monthly_averages = []
-    for group in monthly_groups:
-        if group:  # Only if we have data for this month
-            avg = sum(group) / len(group)
-            monthly_averages.append(avg)
-    
-    if len(monthly_averages) < 3:
+    if monthly_averages.size < 3:
         return 1  # Need at least 3 months with data
     
     # TRUE SEASONAL PATTERN DETECTION:
     # Look for recurring peaks and valleys that repeat every year
     
-    # Calculate the variance of monthly averages (how much they vary from month to month)
-    mean_avg = sum(monthly_averages) / len(monthly_averages)
-    variance = sum((x - mean_avg) ** 2 for x in monthly_averages) / len(monthly_averages)
-    std_dev = variance ** 0.5
+    # Calculate the spread of monthly averages (how much they vary from month to
+    # month); ndarray.std subtracts the mean before squaring, so it has none of
+    # the cancellation of the one-pass E[X^2] - E[X]^2 form
+    std_dev = float(monthly_averages.std())
     
     # Calculate the range of monthly averages
-    monthly_range = max(monthly_averages) - min(monthly_averages)
+    monthly_range = float(np.ptp(monthly_averages))
     
     # If there's very little variation, it's not seasonal
     if monthly_range < 10:
@@ -101,18 +239,11 @@ def calculate_seasonality_from_residuals_current(detrended_data):
         alt_strength = std_dev / 100
         seasonal_strength = max(seasonal_strength, alt_strength)
     
-    # Map seasonal strength to seasonality score
-    if seasonal_strength < 1.0:
-        return 1      # Low seasonality (< 1.0 normalized)
-    elif seasonal_strength < 2.0:
-        return 2      # Low-medium seasonality (1.0-2.0)
-    elif seasonal_strength < 4.0:
-        return 3      # Medium seasonality (2.0-4.0)
-    elif seasonal_strength < 6.0:
-        return 4      # Medium-high seasonality (4.0-6.0)
-    else:
-        return 5      # High seasonality (> 6.0)
+    # Map seasonal strength to seasonality score: one more point per bound
+    # reached (a strength equal to a bound is in the bucket above it)
+    return 1 + bisect.bisect_right(_CURRENT_STRENGTH_BOUNDS, seasonal_strength)
 
+@_memoize_by_values
 def calculate_seasonality_current(monthly_data):
     """
     CURRENT seasonality logic from product_validator.py
@@ -132,33 +263,19 @@ def calculate_seasonality_current(monthly_data):
         int: Seasonality score (1=low, 5=high)
     """
     # Convert to numbers and handle missing data
-    numeric_data = []
-    for value in monthly_data:
-        try:
-            num = int(value)
-            numeric_data.append(num)
-        except (ValueError, TypeError):
-            numeric_data.append(0)
+    numeric_data = _monthly_numbers(monthly_data)
     
     if len(numeric_data) < 3:
         return 1  # Need at least 3 points for trend analysis
     
-    # Step 1: Calculate linear trend (y = mx + b)
-    months = list(range(len(numeric_data)))
-    slope, intercept = calculate_linear_trend(months, numeric_data)
-    
-    # Step 2: Remove trend (detrend the data)
-    detrended_data = []
-    for i, value in enumerate(numeric_data):
-        trend_value = slope * i + intercept
-        detrended = value - trend_value
-        detrended_data.append(detrended)
+    # Steps 1-2: Fit the linear trend and remove it
+    slope, intercept, detrended_data = detrend(numeric_data)
     
     # Step 3: Calculate seasonality from detrended residuals
     return calculate_seasonality_from_residuals_current(detrended_data)
 
 # NEW IMPROVED ALGORITHM (EXPERIMENTAL)
-def calculate_seasonality_from_residuals(detrended_data):
+def _seasonality_details(detrended_data):
     """
     Calculate TRUE seasonality score by detecting recurring monthly patterns.
     
@@ -172,74 +289,55 @@ def calculate_seasonality_from_residuals(detrended_data):
         detrended_data: List of detrended values (residuals)
         
     Returns:
-        int: TRUE seasonality score (1=no pattern, 5=strong recurring pattern)
+        tuple: (score, details) where score is the TRUE seasonality score
+            (1=no pattern, 5=strong recurring pattern) and details holds the
+            intermediate values computed before the score was decided
     """
+    details = {}
     if len(detrended_data) < 12:
-        return 1  # Need at least 12 months for seasonal analysis
-    
-    # Group residuals by month position (0=Jan, 1=Feb, etc.)
-    months_per_year = 12
-    monthly_groups = [[] for _ in range(months_per_year)]
-    
-    for i, value in enumerate(detrended_data):
-        month_position = i % months_per_year
-        monthly_groups[month_position].append(value)
-    
-    # Calculate monthly statistics across years
-    monthly_averages = []
-    monthly_consistency = []  # How consistent each month is across years
-    
-    for group in monthly_groups:
-        if group:  # Only if we have data for this month
-            avg = sum(group) / len(group)
-            monthly_averages.append(avg)
-            
-            # Calculate consistency (lower std = more consistent)
-            if len(group) > 1:
-                variance = sum((x - avg) ** 2 for x in group) / len(group)
-                std = variance ** 0.5
-                consistency = 1.0 / (1.0 + std / 50)  # Normalize consistency score
-            else:
-                consistency = 1.0  # Single data point is perfectly consistent
-            monthly_consistency.append(consistency)
-        else:
-            monthly_averages.append(0)
-            monthly_consistency.append(0)
-    
-    if len([x for x in monthly_averages if x != 0]) < 6:
-        return 1  # Need at least 6 months with data
+        return 1, details  # Need at least 12 months for seasonal analysis
+    
+    # Calculate monthly statistics across years, one bincount per statistic;
+    # with at least 12 values every month position has data
+    residuals = np.asarray(detrended_data, dtype=np.float64)
+    averages, positions, counts = _monthly_averages(residuals)
+    monthly_averages = averages.tolist()
+    details['monthly_averages'] = monthly_averages
+    
+    # How consistent each month is across years (lower std = more consistent).
+    # A month seen only once has std 0, i.e. it is perfectly consistent
+    deviations = residuals - averages[positions]
+    monthly_std = np.sqrt(np.bincount(positions, weights=deviations * deviations, minlength=12) / counts)
+    monthly_consistency = 1.0 / (1.0 + monthly_std / 50)  # Normalize consistency score
+    
+    # Months with data: one mask over the averages, reused for every check below
+    valid_averages = averages[averages != 0]
+    if valid_averages.size < 6:
+        return 1, details  # Need at least 6 months with data
     
     # TRUE SEASONAL PATTERN DETECTION:
     # Look for recurring patterns that make seasonal sense
     
     # 1. Calculate pattern strength (how much months differ from each other)
-    valid_averages = [x for x in monthly_averages if x != 0]
-    if len(valid_averages) < 6:
-        return 1
-        
-    monthly_range = max(valid_averages) - min(valid_averages)
+    monthly_range = float(np.ptp(valid_averages))
+    details['monthly_range'] = monthly_range
     
     # If there's very little variation, it's not seasonal
     if monthly_range < 15:
-        return 1
+        return 1, details
     
     # 2. Detect seasonal structure: look for coherent patterns
     # Check if months form logical seasonal groups (e.g., summer high, winter low)
     
     # Create a "seasonal signature" by normalizing monthly averages
-    mean_avg = sum(valid_averages) / len(valid_averages)
-    normalized_months = [(avg - mean_avg) for avg in monthly_averages]
+    mean_avg = valid_averages.mean()
+    normalized_months = averages - mean_avg
     
     # 3. Check for pattern coherence: do consecutive months have similar behavior?
-    coherence_score = 0
-    for i in range(len(normalized_months) - 1):
-        # If consecutive months have similar signs (both positive or both negative), it's more coherent
-        if normalized_months[i] * normalized_months[i + 1] > 0:
-            coherence_score += 1
-    
-    # Add wrap-around check (December to January)
-    if normalized_months[-1] * normalized_months[0] > 0:
-        coherence_score += 1
+    # If consecutive months have similar signs (both positive or both negative), it's
+    # more coherent. Rolling by one pairs every month with the next, including the
+    # wrap-around from December to January
+    coherence_score = int(np.count_nonzero(normalized_months * np.roll(normalized_months, -1) > 0))
     
     coherence_factor = coherence_score / len(normalized_months)
     
@@ -253,23 +351,17 @@ def calculate_seasonality_from_residuals(detrended_data):
     # Higher coherence = more seasonal (e.g., summer months all high)
     
     # Factor C: Consistency across years (how repeatable is the pattern?)
-    avg_consistency = sum(monthly_consistency) / len(monthly_consistency)
+    avg_consistency = float(monthly_consistency.mean())
     
     # Factor D: Pattern clarity (clear peaks and valleys vs random noise)
-    # Count significant peaks and valleys
-    peaks = 0
-    valleys = 0
+    # Count significant peaks and valleys: each interior month compared with
+    # its neighbours through shifted views, all months at once
     threshold = monthly_range * 0.3  # 30% of range
-    
-    for i in range(1, len(normalized_months) - 1):
-        if (normalized_months[i] > normalized_months[i-1] and 
-            normalized_months[i] > normalized_months[i+1] and 
-            normalized_months[i] > threshold):
-            peaks += 1
-        elif (normalized_months[i] < normalized_months[i-1] and 
-              normalized_months[i] < normalized_months[i+1] and 
-              normalized_months[i] < -threshold):
-            valleys += 1
+    center = normalized_months[1:-1]
+    before = normalized_months[:-2]
+    after = normalized_months[2:]
+    peaks = int(np.count_nonzero((center > before) & (center > after) & (center > threshold)))
+    valleys = int(np.count_nonzero((center < before) & (center < after) & (center < -threshold)))
     
     pattern_clarity = min((peaks + valleys) / 4.0, 1.0)  # Normalize to 0-1, cap at 1
     
@@ -282,19 +374,31 @@ def calculate_seasonality_from_residuals(detrended_data):
         pattern_clarity * 0.1        # 10% - Clear peaks/valleys
     )
     
-    # Map to seasonality score - INVERTED because lower scores = better seasonality  
-    # Ultra-fine-tuned so ONLY sunscreen (0.839) gets 5
-    if seasonal_score > 1.13:
-        return 1      # No seasonal pattern (electric_toothbrush: 1.133)
-    elif seasonal_score > 1.09:
-        return 2      # Weak seasonal pattern (electric_toothbrush should be 2)
-    elif seasonal_score > 0.863:
-        return 3      # Moderate seasonal pattern (toothpaste: 0.865, body_wash: 1.095)
-    elif seasonal_score > 0.84:
-        return 4      # Strong seasonal pattern
-    else:
-        return 5      # Very strong seasonal pattern (ONLY sunscreen: 0.839)
+    details.update(
+        strength_factor=strength_factor,
+        coherence_factor=coherence_factor,
+        avg_consistency=avg_consistency,
+        pattern_clarity=pattern_clarity,
+        seasonal_score=seasonal_score,
+    )
+    
+    # Map to seasonality score - INVERTED because lower scores = better seasonality:
+    # one point less per bound exceeded (a score equal to a bound stays below it)
+    return 5 - bisect.bisect_left(_NEW_SCORE_BOUNDS, seasonal_score), details
 
+def calculate_seasonality_from_residuals(detrended_data):
+    """
+    Calculate TRUE seasonality score by detecting recurring monthly patterns.
+    
+    Args:
+        detrended_data: List of detrended values (residuals)
+        
+    Returns:
+        int: TRUE seasonality score (1=no pattern, 5=strong recurring pattern)
+    """
+    return _seasonality_details(detrended_data)[0]
+
+@_memoize_by_values
 def calculate_seasonality(monthly_data):
     """
     Calculate TRUE seasonality score (1-5) by removing trend first.
@@ -312,31 +416,109 @@ def calculate_seasonality(monthly_data):
     Returns:
         int: Seasonality score (1=low, 5=high)
     """
+    return calculate_seasonality_detailed(monthly_data)[0]
+
+def calculate_seasonality_detailed(monthly_data):
+    """
+    Calculate the TRUE seasonality score and the statistics behind it.
+    
+    Same steps and score as calculate_seasonality, but also returns what was
+    computed on the way, so callers that report the breakdown do not redo it.
+    
+    Args:
+        monthly_data: List of monthly search volume numbers
+        
+    Returns:
+        tuple: (score, stats) where stats has the numeric data, the trend
+            (slope, intercept), the residuals and every intermediate value of
+            the seasonal analysis that was reached (monthly_averages,
+            monthly_range, strength_factor, coherence_factor, avg_consistency,
+            pattern_clarity, seasonal_score)
+    """
     # Convert to numbers and handle missing data
-    numeric_data = []
-    for value in monthly_data:
-        try:
-            num = int(value)
-            numeric_data.append(num)
-        except (ValueError, TypeError):
-            numeric_data.append(0)
+    numeric_data = _monthly_numbers(monthly_data)
+    stats = {'numeric_data': numeric_data}
     
     if len(numeric_data) < 3:
-        return 1  # Need at least 3 points for trend analysis
+        return 1, stats  # Need at least 3 points for trend analysis
     
-    # Step 1: Calculate linear trend (y = mx + b)
-    months = list(range(len(numeric_data)))
-    slope, intercept = calculate_linear_trend(months, numeric_data)
-    
-    # Step 2: Remove trend (detrend the data)
-    detrended_data = []
-    for i, value in enumerate(numeric_data):
-        trend_value = slope * i + intercept
-        detrended = value - trend_value
-        detrended_data.append(detrended)
+    # Steps 1-2: Fit the linear trend and remove it
+    slope, intercept, detrended_data = detrend(numeric_data)
     
     # Step 3: Calculate seasonality from detrended residuals
-    return calculate_seasonality_from_residuals(detrended_data)
+    score, details = _seasonality_details(detrended_data)
+    stats.update(slope=slope, intercept=intercept, residuals=detrended_data, **details)
+    return score, stats
+
+def detrend_batch(series_list):
+    """
+    Convert and detrend many monthly series at once.
+    
+    Series of the same length are stacked into one 2D array, so the trend
+    fit and the detrending run as axis-wise NumPy operations for all of them
+    together. The result per series is what calculate_seasonality_detailed
+    reports about its trend, and can be scored by either algorithm.
+    
+    Args:
+        series_list: List of monthly data lists (search volume numbers)
+        
+    Returns:
+        list: One stats dict per series, in input order, with the numeric data
+            and, for series of at least 3 months, slope, intercept and residuals
+    """
+    # Convert to numbers and handle missing data, grouping rows by length
+    trends = []
+    by_length = {}
+    for row, monthly_data in enumerate(series_list):
+        numeric_data = _monthly_numbers(monthly_data)
+        trends.append({'numeric_data': numeric_data})
+        by_length.setdefault(len(numeric_data), []).append(row)
+    
+    for n, rows in by_length.items():
+        if n < 3:
+            continue  # Need at least 3 points for trend analysis
+        data = np.array([trends[row]['numeric_data'] for row in rows], dtype=np.float64)
+        
+        # Step 1: Linear trend of every series over consecutive months (closed form)
+        months, x_mean, denominator = _design_constants(n)
+        y_mean = data.mean(axis=1)
+        slopes = (data @ months - n * x_mean * y_mean) / denominator
+        intercepts = y_mean - slopes * x_mean
+        
+        # Step 2: Remove every trend in one broadcast
+        residuals = data - (slopes[:, None] * months + intercepts[:, None])
+        
+        for row, slope, intercept, resid in zip(rows, slopes.tolist(), intercepts.tolist(), residuals):
+            trends[row].update(slope=slope, intercept=intercept, residuals=resid)
+    
+    return trends
+
+def calculate_seasonality_batch(series_list, from_residuals=calculate_seasonality_from_residuals, trends=None):
+    """
+    Calculate seasonality scores for many monthly series at once.
+    
+    The series are detrended together by detrend_batch and each row of
+    residuals is then scored. Scores match calculate_seasonality /
+    calculate_seasonality_current series by series.
+    
+    Args:
+        series_list: List of monthly data lists (search volume numbers)
+        from_residuals: Residual scorer, calculate_seasonality_from_residuals (NEW)
+            or calculate_seasonality_from_residuals_current (CURRENT)
+        trends: detrend_batch(series_list), when already computed (lets both
+            algorithms score the same residuals)
+        
+    Returns:
+        np.ndarray: Seasonality score (1=low, 5=high) per series, in input order
+    """
+    if trends is None:
+        trends = detrend_batch(series_list)
+    
+    # Step 3: Score each series from its residuals (too short to detrend: 1)
+    return np.array(
+        [from_residuals(trend['residuals']) if 'residuals' in trend else 1 for trend in trends],
+        dtype=np.int64,
+    )
 
 def test_seasonality_calculation():
     """
@@ -376,109 +558,71 @@ def test_seasonality_calculation():
     
     results = []
     
-    for keyword, monthly_data in test_cases.items():
+    # Calculate seasonality using BOTH algorithms for comparison: every keyword
+    # is detrended in one batch, and each algorithm scores those same residuals
+    # in one batch call
+    series = list(test_cases.values())
+    trends = detrend_batch(series)
+    scores_new = calculate_seasonality_batch(series, trends=trends).tolist()
+    scores_current = calculate_seasonality_batch(
+        series, calculate_seasonality_from_residuals_current, trends=trends).tolist()
+    
+    for (keyword, stats), seasonality_score_new, seasonality_score_current in zip(
+            zip(test_cases, trends), scores_new, scores_current):
         print(f"🔬 Testing: {keyword}")
         print(f"   Expected: {expected_scores[keyword]}")
         
-        # Calculate seasonality using BOTH algorithms for comparison
-        seasonality_score_new = calculate_seasonality(monthly_data)
-        seasonality_score_current = calculate_seasonality_current(monthly_data)
-        
-        # Detailed calculation breakdown
-        numeric_data = []
-        for value in monthly_data:
-            try:
-                num = int(value)
-                numeric_data.append(num)
-            except (ValueError, TypeError):
-                numeric_data.append(0)
+        # Detailed calculation breakdown from the batch's trend and residuals;
+        # the NEW algorithm's intermediate values are read back for the same
+        # residuals it was scored from
+        numeric_data = stats['numeric_data']
+        slope, intercept = stats['slope'], stats['intercept']
+        detrended_data = stats['residuals']
+        stats = {**stats, **_seasonality_details(detrended_data)[1]}
         
-        months = list(range(len(numeric_data)))
-        slope, intercept = calculate_linear_trend(months, numeric_data)
-        
-        print(f"   📊 Raw data range: {min(numeric_data)} to {max(numeric_data)}")
+        print(f"   📊 Raw data range: {numeric_data.min()} to {numeric_data.max()}")
         print(f"   📈 Trend: y = {slope:.2f}x + {intercept:.2f} (slope: {slope:.2f})")
-        
-        # Show detrending for first few months
-        detrended_data = []
-        for i, value in enumerate(numeric_data):
-            trend_value = slope * i + intercept
-            detrended = value - trend_value
-            detrended_data.append(detrended)
-        
-        print(f"   🔄 Detrended range: {min(detrended_data):.1f} to {max(detrended_data):.1f}")
+        print(f"   🔄 Detrended range: {detrended_data.min():.1f} to {detrended_data.max():.1f}")
         
         # Show seasonal calculation details
-        if len(detrended_data) >= 12:
-            months_per_year = 12
-            monthly_groups = [[] for _ in range(months_per_year)]
+        if 'monthly_averages' in stats:
+            # Range over every month: the algorithm's own range leaves out
+            # months averaging exactly 0 and is not reached when too many do
+            monthly_averages = stats['monthly_averages']
+            monthly_range = max(monthly_averages) - min(monthly_averages)
+            monthly_std = float(np.std(monthly_averages))
             
-            for i, value in enumerate(detrended_data):
-                month_position = i % months_per_year
-                monthly_groups[month_position].append(value)
+            seasonal_strength = monthly_range / 100
+            if monthly_std > 0:
+                alt_strength = monthly_std / 100
+                seasonal_strength = max(seasonal_strength, alt_strength)
             
-            monthly_averages = []
-            for group in monthly_groups:
-                if group:
-                    avg = sum(group) / len(group)
-                    monthly_averages.append(avg)
+            print(f"   📊 TRUE Seasonal Pattern Detection:")
+            print(f"      Monthly averages: {[f'{x:.1f}' for x in monthly_averages[:6]]}... (first 6)")
+            print(f"      Monthly range: {monthly_range:.1f}")
+            print(f"      Monthly std dev: {monthly_std:.1f}")
+            print(f"      Seasonal strength (old method): {seasonal_strength:.3f}")
             
-            if len(monthly_averages) >= 3:
-                mean_of_averages = sum(monthly_averages) / len(monthly_averages)
-                monthly_range = max(monthly_averages) - min(monthly_averages)
-                monthly_variance = sum((x - mean_of_averages) ** 2 for x in monthly_averages) / len(monthly_averages)
-                monthly_std = monthly_variance ** 0.5
-                
-                seasonal_strength = monthly_range / 100
-                if monthly_std > 0:
-                    alt_strength = monthly_std / 100
-                    seasonal_strength = max(seasonal_strength, alt_strength)
-                
-                print(f"   📊 TRUE Seasonal Pattern Detection:")
-                print(f"      Monthly averages: {[f'{x:.1f}' for x in monthly_averages[:6]]}... (first 6)")
-                print(f"      Monthly range: {monthly_range:.1f}")
-                print(f"      Monthly std dev: {monthly_std:.1f}")
-                print(f"      Seasonal strength (old method): {seasonal_strength:.3f}")
+            # The factors the NEW algorithm scored with (simplified debug score:
+            # +0.4 stands in for consistency/clarity, matching the new weights)
+            if monthly_range >= 15 and 'seasonal_score' in stats:
+                strength_factor_debug = stats['strength_factor']
+                coherence_factor_debug = stats['coherence_factor']
+                seasonal_score_debug = strength_factor_debug * 0.2 + coherence_factor_debug * 0.4 + 0.4
                 
-                # Show the actual seasonal_score from the new algorithm
-                # We need to replicate the calculation here for debugging
-                if monthly_range >= 15:
-                    # Replicate the new algorithm calculation for debug
-                    mean_avg_debug = sum([x for x in monthly_averages if x != 0]) / len([x for x in monthly_averages if x != 0])
-                    normalized_months_debug = [(avg - mean_avg_debug) for avg in monthly_averages]
-                    
-                    # Pattern coherence
-                    coherence_score_debug = 0
-                    for i in range(len(normalized_months_debug) - 1):
-                        if normalized_months_debug[i] * normalized_months_debug[i + 1] > 0:
-                            coherence_score_debug += 1
-                    if normalized_months_debug[-1] * normalized_months_debug[0] > 0:
-                        coherence_score_debug += 1
-                    coherence_factor_debug = coherence_score_debug / len(normalized_months_debug)
-                    
-                    # Other factors
-                    strength_factor_debug = min(monthly_range / 100, 2.0)
-                    
-                    # Simplified debug calculation (matching new weights)
-                    seasonal_score_debug = strength_factor_debug * 0.2 + coherence_factor_debug * 0.4 + 0.4  # +0.4 for consistency/clarity
-                    
-                    print(f"      NEW Algorithm: seasonal_score = {seasonal_score_debug:.3f}")
-                    print(f"      → Strength factor: {strength_factor_debug:.3f}, Coherence: {coherence_factor_debug:.3f}")
+                print(f"      NEW Algorithm: seasonal_score = {seasonal_score_debug:.3f}")
+                print(f"      → Strength factor: {strength_factor_debug:.3f}, Coherence: {coherence_factor_debug:.3f}")
         
         print(f"   Result: NEW Algorithm = {seasonality_score_new}, CURRENT Algorithm = {seasonality_score_current}")
         print()
         
-        results.append({
-            'keyword': keyword,
-            'seasonality_new': seasonality_score_new,
-            'seasonality_current': seasonality_score_current,
-            'expected': expected_scores[keyword]
-        })
+        results.append((keyword, seasonality_score_new, seasonality_score_current, expected_scores[keyword]))
     
     # Save results to CSV
     with open('seasonality_test_results.csv', 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=['keyword', 'seasonality_new', 'seasonality_current', 'expected'])
-        writer.writeheader()
+        # Rows are already tuples in column order, so a plain writer takes them as is
+        writer = csv.writer(file)
+        writer.writerow(['keyword', 'seasonality_new', 'seasonality_current', 'expected'])
         writer.writerows(results)
     
     print("✅ Results saved to seasonality_test_results.csv")
@@ -486,8 +630,8 @@ def test_seasonality_calculation():
     
     # Summary
     print("📊 Summary (NEW vs CURRENT Algorithm):")
-    for result in results:
-        print(f"   {result['keyword']}: NEW={result['seasonality_new']}, CURRENT={result['seasonality_current']} ({result['expected']})")
+    for keyword, seasonality_new, seasonality_current, expected in results:
+        print(f"   {keyword}: NEW={seasonality_new}, CURRENT={seasonality_current} ({expected})")
     
     # Analysis of problematic cases
     print()